@@ -1,23 +1,144 @@
 import cv2
 import threading
 import time
-from pyzbar import pyzbar
-from database import Database
+from datetime import datetime
+from database import Database, LeituraWriter
+from decoders import benchmark_decoders, get_decoder, normalize_symbologies
+from read_rate import ReadRateRing
+
+MOTION_SIZE = (160, 90)  # resolução usada para comparar quadros no gate de movimento
+
+def _expand_rect(rect, frame_shape, margin):
+    left, top, width, height = rect
+    pad_x = int(width * margin) + 8
+    pad_y = int(height * margin) + 8
+    frame_h, frame_w = frame_shape[:2]
+    return (max(left - pad_x, 0), max(top - pad_y, 0),
+            min(left + width + pad_x, frame_w), min(top + height + pad_y, frame_h))
+
+def to_gray(frame):
+    """Converte o quadro para tons de cinza uma única vez (pyzbar só usa um canal)"""
+    return frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+def _decode_pyramid(decoder, gray, symbologies, downscale_width):
+    """Tenta primeiro uma versão reduzida; só decodifica em resolução cheia se nada for achado"""
+    width = gray.shape[1]
+    if downscale_width and width > downscale_width:
+        scale = downscale_width / width
+        small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        found = decoder.decode(small, symbologies)
+        if found:
+            return [(code, tuple(int(value / scale) for value in rect)) for code, rect in found]
+    
+    return decoder.decode(gray, symbologies)
+
+def decode_frame(frame, rois=None, roi_margin=0.5, symbologies=None, downscale_width=960, decoder='pyzbar'):
+    """Decodifica um quadro, tentando antes só as regiões da última leitura.
+    
+    Retorna ([(codigo, (left, top, width, height))], roi_hit); roi_hit é None
+    quando não havia regiões e False quando elas falharam e o quadro inteiro
+    foi decodificado.
+    """
+    gray = to_gray(frame)
+    decoder = get_decoder(decoder)
+    
+    if rois:
+        found = {}
+        for rect in rois:
+            x0, y0, x1, y1 = _expand_rect(rect, gray.shape, roi_margin)
+            crop = gray[y0:y1, x0:x1]
+            for code, (left, top, width, height) in _decode_pyramid(decoder, crop, symbologies, downscale_width):
+                found[code] = (left + x0, top + y0, width, height)
+        if found:
+            return list(found.items()), True
+    
+    return _decode_pyramid(decoder, gray, symbologies, downscale_width), (False if rois else None)
 
 class BarcodeReader:
-    def __init__(self, camera_url="http://192.168.1.244:8080/video"):
+    def __init__(self, camera_url="http://192.168.1.244:8080/video", decode_workers=0, db=None):
         self.camera_url = camera_url
+        self.decode_workers = decode_workers  # 0 = decodificar na própria thread
         self.cap = None
         self.running = False
-        self.db = Database()
+        # Compartilhar o Database do app mantém o catálogo em memória coerente com o cadastro
+        self.db = db or Database()
+        # Leituras vão para uma fila gravada em lote fora da thread de decodificação
+        self.writer = LeituraWriter(self.db, on_error=self._writer_error)
         self.code_states = {}  # {codigo: {status: bool, last_seen: float, last_read: float}}
         self.callback = None
         self.debounce_time = 0.5  # 500ms debounce
         self.timeout_lost = 1.0   # 1s timeout para marcar como não detectado
+        
+        # Gate de movimento: pula a decodificação se a imagem não mudou
+        self.motion_gate = True
+        self.motion_threshold = 2.0     # diferença média de intensidade (0-255)
+        self.motion_max_interval = 1.0  # decodifica ao menos uma vez por segundo
+        
+        # ROI: decodifica primeiro em volta dos códigos da última leitura
+        self.roi_tracking = True
+        self.roi_margin = 0.5   # margem proporcional ao tamanho do código
+        self.roi_full_every = 10  # a cada N quadros decodifica o quadro inteiro
+        
+        # Pré-processamento: pirâmide cinza reduzida -> resolução cheia
+        self.downscale_width = 960  # largura da primeira tentativa (None desativa)
+        self.symbologies = None     # ex.: ['EAN13', 'CODE_128']; None = todas
+        
+        # Decodificador: 'pyzbar', 'opencv' ou 'auto' (calibra nos primeiros quadros)
+        self.decoder = 'pyzbar'
+        self.active_decoder = 'pyzbar'
+        self.calibration_frames = 30
+        self.min_detection_rate = 0.9
+        self.decoder_benchmark = {}
+        
+        self.stats_interval = 5.0  # intervalo (s) dos contadores enviados ao callback
+        # Leituras aceitas por minuto, para o painel de ritmo (lido pela interface)
+        self.read_rate = ReadRateRing()
+        
+        # Quadro mais recente entregue pela captura (só o último é decodificado)
+        self._frame_cond = threading.Condition()
+        self._latest_frame = None
+        self._latest_time = 0.0
+        self._capture_ended = False
+        # Parada da sessão atual: threads de uma sessão anterior ainda presas não mexem na nova
+        self._parada = None
+        self._reset_counters()
+    
+    def _reset_counters(self):
+        self.frames_captured = 0
+        self.frames_decoded = 0
+        self.frames_dropped = 0
+        self.frames_skipped = 0
+        self.roi_hits = 0
+        self.roi_misses = 0
+        
+        self._motion_ref = None
+        self._motion_time = 0.0
+        self._last_codes = []
+        self._last_rects = []
+        self._roi_streak = 0
+        self._stats_time = time.time()
+        self._calibration_samples = None
+    
+    @property
+    def symbologies(self):
+        return self._symbologies
+    
+    @symbologies.setter
+    def symbologies(self, names):
+        # Normaliza e valida já na configuração: um nome inválido pararia a leitura no meio
+        self._symbologies = normalize_symbologies(names)
     
     def set_callback(self, callback):
         self.callback = callback
     
+    def _writer_error(self, message, msg_type):
+        if self.callback:
+            self.callback(message, msg_type)
+    
+    def flush(self):
+        """Aguarda a gravação das leituras já aceitas"""
+        self.writer.flush()
+    
     def start_reading(self):
         if self.running:
             return False
@@ -28,73 +149,316 @@ class BarcodeReader:
                 return False
             
             self.code_states.clear()  # Limpar estados
+            self._latest_frame = None
+            self._capture_ended = False
+            self._reset_counters()
+            if self.decoder == 'auto':
+                self.active_decoder = 'pyzbar'  # usado enquanto as amostras são coletadas
+                self.request_calibration()
+            else:
+                self.active_decoder = self.decoder
+            
+            self.writer.start()
             self.running = True
-            self.thread = threading.Thread(target=self._read_loop)
+            self._parada = threading.Event()
+            # Captura só esvazia o fluxo; decodificação pega sempre o quadro mais novo
+            self.capture_thread = threading.Thread(target=self._capture_loop, args=(self.cap, self._parada))
+            self.capture_thread.daemon = True
+            self.thread = threading.Thread(target=self._read_loop, args=(self._parada,))
             self.thread.daemon = True
+            self.capture_thread.start()
             self.thread.start()
             return True
         except Exception:
             return False
     
     def stop_reading(self):
+        if self._parada:
+            self._parada.set()
         self.running = False
-        if self.cap:
+        with self._frame_cond:
+            self._frame_cond.notify_all()
+        
+        # A thread de captura libera a câmera ao sair
+        for thread in (getattr(self, 'thread', None), getattr(self, 'capture_thread', None)):
+            if thread and thread is not threading.current_thread():
+                thread.join(timeout=2.0)
+        capture_thread = getattr(self, 'capture_thread', None)
+        if capture_thread and capture_thread.is_alive() and self.cap is not None:
+            # Câmera travada em cap.read(): libera aqui para a leitura presa retornar
             self.cap.release()
+        
+        # Grava o que ainda está na fila antes de encerrar
+        self.writer.close()
     
-    def _read_loop(self):
-        while self.running:
-            try:
-                ret, frame = self.cap.read()
+    def request_calibration(self):
+        """Calibra o decodificador nos próximos quadros da câmera"""
+        self._calibration_samples = []
+    
+    def calibrate(self, frames):
+        """Mede os decodificadores nos quadros de amostra e fica com o mais rápido
+        que atinge min_detection_rate"""
+        best, self.decoder_benchmark = benchmark_decoders(
+            [to_gray(frame) for frame in frames], self.min_detection_rate, self.symbologies
+        )
+        self.active_decoder = best
+        if self.callback:
+            details = ", ".join(
+                f"{name}: {result['fps']:.0f} q/s, {result['detection_rate']:.0%}"
+                for name, result in self.decoder_benchmark.items()
+            )
+            self.callback(f"Decodificador selecionado: {best} ({details})", "info")
+        return best
+    
+    def _collect_calibration(self, gray):
+        if self._calibration_samples is None:
+            return
+        self._calibration_samples.append(gray)
+        if len(self._calibration_samples) >= self.calibration_frames:
+            samples, self._calibration_samples = self._calibration_samples, None
+            self.calibrate(samples)
+    
+    def get_stats(self):
+        return {
+            'frames_captured': self.frames_captured,
+            'frames_decoded': self.frames_decoded,
+            'frames_dropped': self.frames_dropped,
+            'frames_skipped': self.frames_skipped,
+            'roi_hits': self.roi_hits,
+            'roi_misses': self.roi_misses,
+        }
+    
+    def _capture_loop(self, cap, parada):
+        try:
+            while not parada.is_set():
+                ret, frame = cap.read()
                 if not ret:
+                    if not parada.is_set() and self.callback:
+                        self.callback("Fluxo da câmera encerrado", "warning")
                     break
                 
-                current_time = time.time()
-                detected_codes = set()
-                
-                # Decodificar códigos de barras
-                barcodes = pyzbar.decode(frame)
+                with self._frame_cond:
+                    # Sessão encerrada enquanto cap.read() esperava: o quadro não é desta sessão
+                    if parada.is_set():
+                        break
+                    # Quadro anterior ainda não decodificado é descartado
+                    if self._latest_frame is not None:
+                        self.frames_dropped += 1
+                    self._latest_frame = frame
+                    self._latest_time = time.time()
+                    self.frames_captured += 1
+                    self._frame_cond.notify()
+        except Exception as e:
+            if self.callback:
+                self.callback(f"Erro na captura: {str(e)}", "error")
+        finally:
+            with self._frame_cond:
+                if self._parada is parada:
+                    self._capture_ended = True
+                    self._frame_cond.notify_all()
+            cap.release()
+    
+    def _next_frame(self, timeout=0.5):
+        """Retira o quadro mais recente (None se nada chegou dentro do timeout)"""
+        with self._frame_cond:
+            if self._latest_frame is None and self.running and not self._capture_ended:
+                self._frame_cond.wait(timeout=timeout)
+            if self._latest_frame is None:
+                return None, 0.0
+            
+            frame, capture_time = self._latest_frame, self._latest_time
+            self._latest_frame = None
+            return frame, capture_time
+    
+    def _has_motion(self, gray, capture_time):
+        if not self.motion_gate:
+            return True
+        
+        small = cv2.resize(gray, MOTION_SIZE, interpolation=cv2.INTER_AREA)
+        
+        # Compara com o último quadro decodificado, então mudanças lentas também acumulam
+        if (self._motion_ref is not None
+                and capture_time - self._motion_time < self.motion_max_interval
+                and cv2.absdiff(small, self._motion_ref).mean() < self.motion_threshold):
+            return False
+        
+        self._motion_ref = small
+        self._motion_time = capture_time
+        return True
+    
+    def _next_rois(self):
+        if not self.roi_tracking or not self._last_rects or self._roi_streak >= self.roi_full_every:
+            self._roi_streak = 0
+            return None
+        self._roi_streak += 1
+        return self._last_rects
+    
+    def _skip_frame(self, capture_time):
+        # Imagem parada: os mesmos códigos continuam à vista
+        self.frames_skipped += 1
+        self._update_states(self._last_codes, capture_time)
+        self._report_stats()
+    
+    def _handle_decoded(self, decoded, roi_hit, capture_time):
+        self.frames_decoded += 1
+        if roi_hit is True:
+            self.roi_hits += 1
+        elif roi_hit is False:
+            self.roi_misses += 1
+        
+        self._last_codes = [code for code, _ in decoded]
+        self._last_rects = [rect for _, rect in decoded]
+        self._update_states(self._last_codes, capture_time)
+        self._report_stats()
+    
+    def _report_stats(self):
+        now = time.time()
+        if not self.callback or now - self._stats_time < self.stats_interval:
+            return
+        self._stats_time = now
+        self.callback(
+            f"Quadros: {self.frames_decoded} decodificados, {self.frames_skipped} sem movimento, "
+            f"{self.frames_dropped} descartados | ROI: {self.roi_hits} acertos, {self.roi_misses} falhas",
+            "stats"
+        )
+    
+    def _read_loop(self, parada):
+        try:
+            if self.decode_workers:
+                self._read_loop_pool(parada)
+            else:
+                self._read_loop_single(parada)
+        finally:
+            # Erro ou fim do fluxo: para a captura também e grava o que ficou na fila
+            # (uma leitura nova já iniciada tem outra parada e não é afetada)
+            encerrou_sozinha = False
+            with self._frame_cond:
+                if self._parada is parada and not parada.is_set():
+                    encerrou_sozinha = True
+                    parada.set()
+                    self._frame_cond.notify_all()
+            if encerrou_sozinha:
+                # running só cai depois de gravar a fila: até lá Iniciar não abre outra sessão
+                self.writer.close()
+                with self._frame_cond:
+                    if self._parada is parada:
+                        self.running = False
+            # Cada Iniciar cria uma thread nova; a conexão desta não sobrevive a ela
+            self.db.fechar_conexao_da_thread()
+    
+    def _read_loop_single(self, parada):
+        while not parada.is_set():
+            try:
+                frame, capture_time = self._next_frame()
+                if frame is None:
+                    if self._capture_ended:
+                        break
+                    continue
                 
-                for barcode in barcodes:
-                    barcode_data = barcode.data.decode('utf-8')
-                    detected_codes.add(barcode_data)
-                    
-                    # Inicializar estado se não existe
-                    if barcode_data not in self.code_states:
-                        self.code_states[barcode_data] = {
-                            'detected': False,
-                            'last_seen': current_time,
-                            'last_read': 0
-                        }
-                    
-                    state = self.code_states[barcode_data]
-                    state['last_seen'] = current_time
-                    
-                    # Transição: não detectado -> detectado
-                    if not state['detected']:
-                        # Aplicar debounce
-                        if current_time - state['last_read'] >= self.debounce_time:
-                            state['detected'] = True
-                            state['last_read'] = current_time
-                            
-                            # Registrar leitura
-                            if self.db.produto_exists(barcode_data):
-                                self.db.add_leitura(barcode_data)
-                                if self.callback:
-                                    self.callback(f"Código lido: {barcode_data}", "success")
-                            else:
-                                if self.callback:
-                                    self.callback(f"Código não cadastrado: {barcode_data}", "warning")
+                gray = to_gray(frame)
+                self._collect_calibration(gray)
+                if not self._has_motion(gray, capture_time):
+                    self._skip_frame(capture_time)
+                    continue
                 
-                # Marcar como não detectado os códigos que não foram vistos
-                for code, state in self.code_states.items():
-                    if code not in detected_codes:
-                        if current_time - state['last_seen'] >= self.timeout_lost:
-                            state['detected'] = False
+                # Decodificar códigos de barras
+                decoded, roi_hit = decode_frame(gray, self._next_rois(), self.roi_margin,
+                                                self.symbologies, self.downscale_width, self.active_decoder)
+                self._handle_decoded(decoded, roi_hit, capture_time)
                 
             except Exception as e:
                 if self.callback:
                     self.callback(f"Erro na leitura: {str(e)}", "error")
                 break
     
+    def _read_loop_pool(self, parada):
+        from decode_pool import DecodePool
+        
+        pool = None
+        try:
+            while not parada.is_set():
+                if pool:
+                    # Com o anel cheio, espera o quadro mais antigo terminar
+                    for (decoded, roi_hit), capture_time in pool.collect(wait=pool.full()):
+                        self._handle_decoded(decoded, roi_hit, capture_time)
+                
+                frame, capture_time = self._next_frame(timeout=0.05)
+                if frame is None:
+                    if self._capture_ended:
+                        break
+                    continue
+                
+                gray = to_gray(frame)
+                self._collect_calibration(gray)
+                if not self._has_motion(gray, capture_time):
+                    # Entrega o que está em voo antes, para manter a ordem dos quadros
+                    if pool:
+                        for (decoded, roi_hit), pending_time in pool.drain():
+                            self._handle_decoded(decoded, roi_hit, pending_time)
+                    self._skip_frame(capture_time)
+                    continue
+                
+                # O anel guarda o quadro já em cinza: um terço da cópia do BGR
+                if pool is None or not pool.matches(gray):
+                    if pool:
+                        self._finish_pool(pool)
+                    pool = DecodePool(gray.shape, gray.dtype, workers=self.decode_workers)
+                
+                pool.submit(gray, capture_time, self._next_rois(), self.roi_margin,
+                            self.symbologies, self.downscale_width, self.active_decoder)
+        except Exception as e:
+            if self.callback:
+                self.callback(f"Erro na leitura: {str(e)}", "error")
+        finally:
+            if pool:
+                self._finish_pool(pool)
+    
+    def _finish_pool(self, pool):
+        try:
+            for (decoded, roi_hit), capture_time in pool.drain():
+                self._handle_decoded(decoded, roi_hit, capture_time)
+        finally:
+            pool.close()
+    
+    def _update_states(self, codes, current_time):
+        detected_codes = set()
+        
+        for barcode_data in codes:
+            detected_codes.add(barcode_data)
+            
+            # Inicializar estado se não existe
+            if barcode_data not in self.code_states:
+                self.code_states[barcode_data] = {
+                    'detected': False,
+                    'last_seen': current_time,
+                    'last_read': 0
+                }
+            
+            state = self.code_states[barcode_data]
+            state['last_seen'] = current_time
+            
+            # Transição: não detectado -> detectado
+            if not state['detected']:
+                # Aplicar debounce
+                if current_time - state['last_read'] >= self.debounce_time:
+                    state['detected'] = True
+                    state['last_read'] = current_time
+                    
+                    # Registrar leitura
+                    if self.db.produto_exists(barcode_data):
+                        self.writer.push(barcode_data, datetime.fromtimestamp(current_time))
+                        self.read_rate.add(barcode_data, current_time)
+                        if self.callback:
+                            self.callback(f"Código lido: {barcode_data}", "success")
+                    else:
+                        if self.callback:
+                            self.callback(f"Código não cadastrado: {barcode_data}", "warning")
+        
+        # Marcar como não detectado os códigos que não foram vistos
+        for code, state in self.code_states.items():
+            if code not in detected_codes:
+                if current_time - state['last_seen'] >= self.timeout_lost:
+                    state['detected'] = False
+    
     def is_running(self):
-        return self.running
\ No newline at end of file
+        return self.running
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""Importação e exportação do catálogo de produtos (CSV ou XLSX)"""
+
+import argparse
+import csv
+import os
+import sys
+import time
+
+from database import Database
+
+CABECALHO = ['codigo_barras', 'descricao']
+NOMES_CODIGO = {'codigo', 'código', 'codigo_barras', 'código de barras', 'codigo de barras'}
+
+def _texto(valor):
+    # Planilhas costumam guardar EAN como número (7891234567890.0)
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    return "" if valor is None else str(valor).strip()
+
+def _sem_cabecalho(linhas):
+    primeira = True
+    for linha in linhas:
+        if primeira:
+            primeira = False
+            if linha and _texto(linha[0]).lower() in NOMES_CODIGO:
+                continue
+        yield linha
+
+def ler_csv(filename):
+    with open(filename, newline='', encoding='utf-8-sig') as arquivo:
+        # Excel em português grava CSV com ';': escolhe o separador mais frequente na 1ª linha
+        primeira = arquivo.readline()
+        arquivo.seek(0)
+        delimitador = max(',;\t', key=primeira.count)
+        for linha in _sem_cabecalho(csv.reader(arquivo, delimiter=delimitador)):
+            yield [_texto(valor) for valor in linha[:2]]
+
+def ler_xlsx(filename):
+    from openpyxl import load_workbook
+    
+    # read_only percorre a planilha sem carregá-la inteira na memória
+    workbook = load_workbook(filename, read_only=True, data_only=True)
+    try:
+        linhas = workbook.active.iter_rows(values_only=True)
+        for linha in _sem_cabecalho(linhas):
+            yield [_texto(valor) for valor in linha[:2]]
+    finally:
+        workbook.close()
+
+def importar_catalogo(db, filename):
+    """Retorna {'inseridos', 'atualizados', 'duplicados', 'rejeitados'}"""
+    if filename.lower().endswith('.xlsx'):
+        linhas = ler_xlsx(filename)
+    else:
+        linhas = ler_csv(filename)
+    return db.upsert_produtos(linhas)
+
+def exportar_catalogo(db, filename):
+    """Grava o catálogo em CSV ou XLSX; retorna a quantidade de produtos"""
+    total = 0
+    if filename.lower().endswith('.xlsx'):
+        from openpyxl import Workbook
+        
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet('Produtos')
+        sheet.append(CABECALHO)
+        for bloco in db.iter_produtos():
+            for linha in bloco:
+                sheet.append(list(linha))
+            total += len(bloco)
+        workbook.save(filename)
+    else:
+        with open(filename, 'w', newline='', encoding='utf-8') as arquivo:
+            writer = csv.writer(arquivo)
+            writer.writerow(CABECALHO)
+            for bloco in db.iter_produtos():
+                writer.writerows(bloco)
+                total += len(bloco)
+    return total
+
+def main():
+    parser = argparse.ArgumentParser(description="Importa ou exporta o catálogo de produtos")
+    parser.add_argument("--db", default="barcode_reader.db", help="arquivo do banco")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+    importar = subparsers.add_parser("importar", help="insere/atualiza produtos de um CSV ou XLSX")
+    importar.add_argument("arquivo")
+    exportar = subparsers.add_parser("exportar", help="grava o catálogo em CSV ou XLSX")
+    exportar.add_argument("arquivo")
+    args = parser.parse_args()
+    
+    if args.comando == "importar" and not os.path.exists(args.arquivo):
+        print(f"Arquivo não encontrado: {args.arquivo}")
+        return 1
+    
+    db = Database(args.db)
+    inicio = time.perf_counter()
+    try:
+        if args.comando == "importar":
+            resultado = importar_catalogo(db, args.arquivo)
+            print(f"Inseridos: {resultado['inseridos']}, atualizados: {resultado['atualizados']}, "
+                  f"duplicados: {resultado['duplicados']}, rejeitados: {resultado['rejeitados']}")
+        else:
+            total = exportar_catalogo(db, args.arquivo)
+            print(f"Exportados: {total}")
+    finally:
+        db.close()
+    print(f"Concluído em {time.perf_counter() - inicio:.2f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,136 +1,966 @@
+import argparse
+import queue
 import sqlite3
-from datetime import datetime
+import threading
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+CATALOGO_MAX = 100000  # entradas em memória antes de descartar o catálogo
+CATALOGO_REVALIDAR_S = 1.0  # intervalo para notar cadastros feitos por outros processos
+
+# Ajustes aplicados a cada conexão (journal_mode=WAL fica gravado no arquivo)
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",   # seguro com WAL; fsync só no checkpoint
+    "PRAGMA cache_size=-20000",    # ~20 MB de cache de páginas
+    "PRAGMA mmap_size=268435456",  # 256 MB mapeados em memória
+    "PRAGMA temp_store=MEMORY",
+)
+
+# Turnos (nome, hora de início, hora de fim); fim <= início cruza a meia-noite
+# e as horas depois da meia-noite contam para o dia em que o turno começou
+TURNOS = (
+    ("Manhã", 6, 14),
+    ("Tarde", 14, 22),
+    ("Noite", 22, 6),
+)
 
 class Database:
     def __init__(self, db_name="barcode_reader.db"):
         self.db_name = db_name
+        # Uma conexão longa por thread: GUI, leitor e relatórios não disputam a mesma
+        self._local = threading.local()
+        self._conexoes = []
+        self._conexoes_lock = threading.Lock()
+        # Catálogo em memória: {codigo: (produto_id, descricao)}; produto_id None = não cadastrado
+        self._catalogo = {}
+        self._catalogo_versao = 0
+        self._catalogo_lock = threading.Lock()
+        self._catalogo_versao_banco = None  # meta.produtos_versao quando o catálogo foi validado
+        self._catalogo_validado = 0.0
+        self._busca_texto = None  # produtos_fts existe? (SQLite sem FTS5 busca com LIKE)
         self.init_database()
     
+    def _get_conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # timeout alto: com WAL só escritas concorrentes esperam umas pelas outras
+            conn = sqlite3.connect(self.db_name, timeout=30, check_same_thread=False)
+            for pragma in PRAGMAS:
+                conn.execute(pragma)
+            self._local.conn = conn
+            with self._conexoes_lock:
+                self._conexoes.append(conn)
+        return conn
+    
+    def fechar_conexao_da_thread(self):
+        """Fecha a conexão da thread atual; chamada por threads que terminam antes do app"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            return
+        del self._local.conn
+        with self._conexoes_lock:
+            if conn in self._conexoes:
+                self._conexoes.remove(conn)
+        conn.close()
+    
+    def close(self):
+        """Fecha as conexões de todas as threads (são reabertas no próximo uso)"""
+        with self._conexoes_lock:
+            conexoes, self._conexoes = self._conexoes, []
+            self._local = threading.local()
+        for conn in conexoes:
+            conn.close()
+    
     def init_database(self):
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
+        conn = self._get_conn()
+        novo = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'produtos'").fetchone() is None
         
-        # Tabela produtos
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS produtos (
-                codigo_barras TEXT PRIMARY KEY,
-                descricao TEXT
-            )
-        ''')
+        if novo:
+            with conn:
+                _criar_esquema(conn)
+                conn.execute(f"PRAGMA user_version = {len(MIGRACOES)}")
+        else:
+            self._migrar(conn)
+    
+    def _migrar(self, conn):
+        """Aplica as migrações pendentes, controladas por PRAGMA user_version"""
+        versao = conn.execute("PRAGMA user_version").fetchone()[0]
+        for numero, migracao in enumerate(MIGRACOES[versao:], start=versao + 1):
+            # BEGIN explícito: o módulo sqlite3 não abre transação antes de DDL
+            conn.execute("BEGIN")
+            try:
+                migracao(conn)
+                conn.execute(f"PRAGMA user_version = {numero}")
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+    
+    def _atualizar_catalogo(self, entradas, versao_banco):
+        with self._catalogo_lock:
+            self._catalogo_versao += 1
+            self._catalogo.update(entradas)
+            self._acompanhar_versao_banco(versao_banco)
+    
+    def _limpar_catalogo(self, versao_banco):
+        with self._catalogo_lock:
+            self._catalogo_versao += 1
+            self._catalogo.clear()
+            self._acompanhar_versao_banco(versao_banco)
+    
+    def _invalidar_catalogo(self, codigos, versao_banco):
+        with self._catalogo_lock:
+            self._catalogo_versao += 1
+            for codigo in codigos:
+                self._catalogo.pop(codigo, None)
+            self._acompanhar_versao_banco(versao_banco)
+    
+    def _acompanhar_versao_banco(self, versao_banco):
+        # Escrita desta instância (já refletida no catálogo) não força revalidação; se outro
+        # processo mudou o cadastro desde a última validação, a versão não encaixa e ela acontece
+        if self._catalogo_versao_banco == versao_banco - 1:
+            self._catalogo_versao_banco = versao_banco
+    
+    def _revalidar_catalogo(self):
+        """Descarta o catálogo se o cadastro mudou no banco (ex.: catalogo.py importar, outra instância)"""
+        agora = time.monotonic()
+        if agora - self._catalogo_validado < CATALOGO_REVALIDAR_S:
+            return
+        row = self._get_conn().execute("SELECT valor FROM meta WHERE chave = 'produtos_versao'").fetchone()
+        versao_banco = row[0] if row else 0
+        with self._catalogo_lock:
+            self._catalogo_validado = agora
+            if versao_banco != self._catalogo_versao_banco:
+                self._catalogo_versao_banco = versao_banco
+                self._catalogo_versao += 1
+                self._catalogo.clear()
+    
+    def _consultar_catalogo(self, codigo_barras):
+        self._revalidar_catalogo()
+        entrada = self._catalogo.get(codigo_barras)
+        if entrada is not None:
+            return entrada
         
-        # Tabela leituras
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS leituras (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                codigo_barras TEXT,
-                data_hora TIMESTAMP,
-                FOREIGN KEY (codigo_barras) REFERENCES produtos (codigo_barras)
-            )
-        ''')
+        versao = self._catalogo_versao
+        cursor = self._get_conn().cursor()
+        cursor.execute("SELECT id, descricao FROM produtos WHERE codigo_barras = ?", (codigo_barras,))
+        result = cursor.fetchone()
         
-        conn.commit()
-        conn.close()
+        entrada = tuple(result) if result else (None, None)
+        with self._catalogo_lock:
+            # Um cadastro concorrente pode ter mudado o produto durante a consulta
+            if versao == self._catalogo_versao:
+                if len(self._catalogo) >= CATALOGO_MAX:
+                    self._catalogo.clear()
+                self._catalogo[codigo_barras] = entrada
+        return entrada
     
     def add_produto(self, codigo_barras, descricao=""):
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
         try:
-            cursor.execute("INSERT INTO produtos (codigo_barras, descricao) VALUES (?, ?)", 
-                         (codigo_barras, descricao))
-            conn.commit()
+            with self._get_conn() as conn:
+                cursor = conn.execute("INSERT INTO produtos (codigo_barras, descricao) VALUES (?, ?)", 
+                                      (codigo_barras, descricao))
+                _recuperar_orfas(conn, [codigo_barras])
+                versao = _incrementar_versao_produtos(conn)
+            self._atualizar_catalogo({codigo_barras: (cursor.lastrowid, descricao)}, versao)
             return True
         except sqlite3.IntegrityError:
             return False
-        finally:
-            conn.close()
     
     def produto_exists(self, codigo_barras):
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        cursor.execute("SELECT 1 FROM produtos WHERE codigo_barras = ?", (codigo_barras,))
-        result = cursor.fetchone()
-        conn.close()
-        return result is not None
+        return self._consultar_catalogo(codigo_barras)[0] is not None
+    
+    def get_descricao(self, codigo_barras):
+        return self._consultar_catalogo(codigo_barras)[1]
     
     def add_leitura(self, codigo_barras):
-        if self.produto_exists(codigo_barras):
-            conn = sqlite3.connect(self.db_name)
-            cursor = conn.cursor()
-            cursor.execute("INSERT INTO leituras (codigo_barras, data_hora) VALUES (?, ?)", 
-                         (codigo_barras, datetime.now()))
-            conn.commit()
-            conn.close()
-            return True
-        return False
+        return self.add_leituras([(codigo_barras, datetime.now())]) == 1
+    
+    def add_leituras(self, leituras):
+        """Grava [(codigo_barras, data_hora)] numa única transação; retorna quantas entraram"""
+        validas = []
+        for codigo, data_hora in leituras:
+            produto_id = self._consultar_catalogo(codigo)[0]
+            if produto_id is not None:
+                validas.append((produto_id, data_hora))
+        if not validas:
+            return 0
+        
+        with self._get_conn() as conn:
+            conn.executemany("INSERT INTO leituras (produto_id, ts) VALUES (?, ?)",
+                             [(produto_id, epoch_ms(data_hora)) for produto_id, data_hora in validas])
+            _acumular_rollups(conn, validas)
+        return len(validas)
+    
+    def rebuild_rollups(self):
+        """Recalcula os totais por produto/dia/hora a partir de todas as leituras"""
+        with self._get_conn() as conn:
+            _reconstruir_rollups(conn)
     
     def get_leituras_stats(self):
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
+        # Totais mantidos a cada inserção: custo proporcional aos produtos, não às leituras
+        cursor = self._get_conn().cursor()
         cursor.execute('''
-            SELECT p.codigo_barras, p.descricao, COUNT(l.id) as total_leituras
-            FROM produtos p
-            LEFT JOIN leituras l ON p.codigo_barras = l.codigo_barras
-            GROUP BY p.codigo_barras, p.descricao
-            HAVING total_leituras > 0
+            SELECT p.codigo_barras, p.descricao, t.total AS total_leituras
+            FROM leituras_totais t
+            JOIN produtos p ON p.id = t.produto_id
+            WHERE t.total > 0
             ORDER BY total_leituras DESC
         ''')
-        result = cursor.fetchall()
-        conn.close()
-        return result
+        return cursor.fetchall()
+    
+    def get_totais_periodo(self, inicio, fim):
+        """Leituras por produto em [inicio, fim), a partir do rollup diário"""
+        cursor = self._get_conn().cursor()
+        cursor.execute('''
+            SELECT p.codigo_barras, p.descricao, SUM(d.total) AS total_leituras
+            FROM leituras_diarias d
+            JOIN produtos p ON p.id = d.produto_id
+            WHERE d.dia >= ? AND d.dia < ?
+            GROUP BY p.id
+            ORDER BY total_leituras DESC
+        ''', (inicio.isoformat(), fim.isoformat()))
+        return cursor.fetchall()
+    
+    def get_total_periodo(self, inicio, fim):
+        cursor = self._get_conn().cursor()
+        cursor.execute("SELECT COALESCE(SUM(total), 0) FROM leituras_diarias WHERE dia >= ? AND dia < ?",
+                       (inicio.isoformat(), fim.isoformat()))
+        return cursor.fetchone()[0]
+    
+    def get_totais_por_hora(self, inicio, fim):
+        """Leituras por (dia, hora) em [inicio, fim).
+        
+        Com datas inteiras vem do rollup horário; com datetime, agrega as
+        leituras do intervalo no próprio SQLite.
+        """
+        cursor = self._get_conn().cursor()
+        if not isinstance(inicio, datetime) and not isinstance(fim, datetime):
+            cursor.execute('''
+                SELECT dia, hora, SUM(total)
+                FROM leituras_horarias
+                WHERE dia >= ? AND dia < ?
+                GROUP BY dia, hora
+                ORDER BY dia, hora
+            ''', (inicio.isoformat(), fim.isoformat()))
+        else:
+            cursor.execute('''
+                SELECT date(ts / 1000, 'unixepoch', 'localtime') AS dia,
+                       CAST(strftime('%H', ts / 1000, 'unixepoch', 'localtime') AS INTEGER) AS hora, COUNT(*)
+                FROM leituras
+                WHERE ts >= ? AND ts < ?
+                GROUP BY dia, hora
+                ORDER BY dia, hora
+            ''', (epoch_ms(inicio), epoch_ms(fim)))
+        return [(date.fromisoformat(dia), hora, total) for dia, hora, total in cursor.fetchall()]
+    
+    def get_totais_por_turno(self, inicio, fim, turnos=TURNOS):
+        """Leituras por (dia, turno) em [inicio, fim), somando os totais por hora"""
+        ordem = {nome: posicao for posicao, (nome, _, _) in enumerate(turnos)}
+        totais = Counter()
+        for dia, hora, total in self.get_totais_por_hora(inicio, fim):
+            totais[_turno_da_hora(dia, hora, turnos)] += total
+        return sorted(((dia, nome, total) for (dia, nome), total in totais.items()),
+                      key=lambda linha: (linha[0], ordem.get(linha[1], len(ordem))))
+    
+    def get_resumo_produtos(self, inicio, fim):
+        """(codigo_barras, descricao, total, primeira, ultima) por produto em [inicio, fim).
+        
+        Primeira e última leitura saem do índice (produto_id, ts), uma busca
+        por produto, sem percorrer as leituras.
+        """
+        if not isinstance(inicio, datetime) and not isinstance(fim, datetime):
+            totais = ("SELECT produto_id, SUM(total) AS total FROM leituras_diarias "
+                      "WHERE dia >= :dia_inicio AND dia < :dia_fim GROUP BY produto_id")
+            parametros = {'dia_inicio': inicio.isoformat(), 'dia_fim': fim.isoformat()}
+        else:
+            totais = ("SELECT produto_id, COUNT(*) AS total FROM leituras "
+                      "WHERE ts >= :inicio AND ts < :fim GROUP BY produto_id")
+            parametros = {}
+        parametros.update(inicio=epoch_ms(inicio), fim=epoch_ms(fim))
+        cursor = self._get_conn().cursor()
+        cursor.execute(f'''
+            WITH totais AS ({totais})
+            SELECT p.codigo_barras, p.descricao, t.total,
+                   (SELECT MIN(ts) FROM leituras WHERE produto_id = t.produto_id AND ts >= :inicio AND ts < :fim),
+                   (SELECT MAX(ts) FROM leituras WHERE produto_id = t.produto_id AND ts >= :inicio AND ts < :fim)
+            FROM totais t
+            JOIN produtos p ON p.id = t.produto_id
+            WHERE t.total > 0
+            ORDER BY t.total DESC
+        ''', parametros)
+        return [(codigo, descricao, total, data_hora_ms(primeira), data_hora_ms(ultima))
+                for codigo, descricao, total, primeira, ultima in cursor.fetchall()]
+    
+    def get_produto(self, codigo_barras):
+        """(id, codigo_barras, descricao) ou None"""
+        cursor = self._get_conn().cursor()
+        cursor.execute("SELECT id, codigo_barras, descricao FROM produtos WHERE codigo_barras = ?", (codigo_barras,))
+        return cursor.fetchone()
+    
+    def get_produtos_pagina(self, apos=None, limite=200, busca=None):
+        """Uma página de produtos (id, codigo_barras, descricao) ordenada por código.
+        
+        apos é o último código da página anterior (paginação por chave, sem
+        OFFSET). busca filtra por prefixo do código (índice único) ou por
+        prefixo das palavras da descrição (FTS5).
+        """
+        conn = self._get_conn()
+        apos = apos or ""
+        busca = (busca or "").strip()
+        if not busca:
+            cursor = conn.execute('''
+                SELECT id, codigo_barras, descricao FROM produtos
+                WHERE codigo_barras > ?
+                ORDER BY codigo_barras LIMIT ?
+            ''', (apos, limite))
+            return cursor.fetchall()
+        
+        parametros = {'apos': apos, 'limite': limite, 'inicio': busca, 'fim': _fim_prefixo(busca)}
+        if self._tem_busca_texto(conn):
+            por_descricao = '''
+                SELECT p.id, p.codigo_barras, p.descricao FROM produtos_fts f
+                JOIN produtos p ON p.id = f.rowid
+                WHERE produtos_fts MATCH :termos AND p.codigo_barras > :apos
+            '''
+            parametros['termos'] = _termos_fts(busca)
+        else:
+            por_descricao = '''
+                SELECT id, codigo_barras, descricao FROM produtos
+                WHERE descricao LIKE :contem AND codigo_barras > :apos
+            '''
+            parametros['contem'] = f"%{busca}%"
+        cursor = conn.execute(f'''
+            SELECT id, codigo_barras, descricao FROM produtos
+            WHERE codigo_barras >= :inicio AND codigo_barras < :fim AND codigo_barras > :apos
+            UNION
+            {por_descricao}
+            ORDER BY codigo_barras LIMIT :limite
+        ''', parametros)
+        return cursor.fetchall()
+    
+    def _tem_busca_texto(self, conn):
+        if self._busca_texto is None:
+            self._busca_texto = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'produtos_fts'").fetchone() is not None
+        return self._busca_texto
     
     def get_produtos(self):
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
+        cursor = self._get_conn().cursor()
         cursor.execute("SELECT codigo_barras, descricao FROM produtos")
-        result = cursor.fetchall()
-        conn.close()
-        return result
+        return cursor.fetchall()
+    
+    def iter_produtos(self, chunk_size=5000):
+        """Produtos (codigo_barras, descricao) em blocos, sem carregar o catálogo inteiro"""
+        cursor = self._get_conn().cursor()
+        cursor.execute("SELECT codigo_barras, descricao FROM produtos ORDER BY id")
+        while True:
+            bloco = cursor.fetchmany(chunk_size)
+            if not bloco:
+                break
+            yield bloco
+    
+    def upsert_produtos(self, produtos, chunk_size=5000):
+        """Insere ou atualiza [(codigo_barras, descricao)] numa única transação.
+        
+        Aceita qualquer iterável (consumido em blocos). Linhas sem código são
+        rejeitadas; sem descrição (coluna ausente ou vazia), um produto já
+        cadastrado mantém a sua. Um código repetido no arquivo vale pela última
+        linha e as anteriores contam como duplicadas.
+        Retorna {'inseridos': n, 'atualizados': n, 'duplicados': n, 'rejeitados': n}.
+        """
+        rejeitados = 0
+        validos = 0
+        codigos = set()
+        
+        conn = self._get_conn()
+        with conn:
+            antes = conn.execute("SELECT COUNT(*) FROM produtos").fetchone()[0]
+            bloco = []
+            for linha in produtos:
+                codigo = str(linha[0]).strip() if linha and linha[0] is not None else ""
+                if not codigo:
+                    rejeitados += 1
+                    continue
+                descricao = str(linha[1]).strip() if len(linha) > 1 and linha[1] is not None else ""
+                bloco.append((codigo, descricao or None))
+                codigos.add(codigo)
+                if len(bloco) >= chunk_size:
+                    validos += self._upsert_bloco(conn, bloco)
+                    bloco = []
+            validos += self._upsert_bloco(conn, bloco)
+            depois = conn.execute("SELECT COUNT(*) FROM produtos").fetchone()[0]
+            _recuperar_orfas(conn)
+            versao = _incrementar_versao_produtos(conn)
+        
+        self._limpar_catalogo(versao)
+        # Cada código distinto foi inserido ou já existia; o resto são repetições no arquivo
+        inseridos = depois - antes
+        return {'inseridos': inseridos, 'atualizados': len(codigos) - inseridos,
+                'duplicados': validos - len(codigos), 'rejeitados': rejeitados}
+    
+    def _upsert_bloco(self, conn, bloco):
+        # Descrição None: produto novo entra com "", existente fica com a que tem
+        conn.executemany('''
+            INSERT INTO produtos (codigo_barras, descricao) VALUES (?, COALESCE(?, ''))
+            ON CONFLICT (codigo_barras) DO UPDATE SET descricao = COALESCE(?, descricao)
+        ''', [(codigo, descricao, descricao) for codigo, descricao in bloco])
+        return len(bloco)
     
     def update_produto(self, codigo_original, novo_codigo, nova_descricao):
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
+        # As leituras apontam para o id do produto, então acompanham a troca de código
         try:
-            cursor.execute("UPDATE produtos SET codigo_barras = ?, descricao = ? WHERE codigo_barras = ?", 
-                         (novo_codigo, nova_descricao, codigo_original))
-            conn.commit()
+            with self._get_conn() as conn:
+                conn.execute("UPDATE produtos SET codigo_barras = ?, descricao = ? WHERE codigo_barras = ?", 
+                             (novo_codigo, nova_descricao, codigo_original))
+                _recuperar_orfas(conn, [novo_codigo])
+                versao = _incrementar_versao_produtos(conn)
+            self._invalidar_catalogo([codigo_original, novo_codigo], versao)
             return True
         except sqlite3.IntegrityError:
             return False
-        finally:
-            conn.close()
     
     def delete_produto(self, codigo_barras):
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM leituras WHERE codigo_barras = ?", (codigo_barras,))
-        cursor.execute("DELETE FROM produtos WHERE codigo_barras = ?", (codigo_barras,))
-        conn.commit()
-        conn.close()
+        produto_id = self._consultar_catalogo(codigo_barras)[0]
+        if produto_id is None:
+            return
+        
+        with self._get_conn() as conn:
+            conn.execute("DELETE FROM leituras WHERE produto_id = ?", (produto_id,))
+            for tabela in ROLLUPS:
+                conn.execute(f"DELETE FROM {tabela} WHERE produto_id = ?", (produto_id,))
+            conn.execute("DELETE FROM produtos WHERE id = ?", (produto_id,))
+            versao = _incrementar_versao_produtos(conn)
+        self._atualizar_catalogo({codigo_barras: (None, None)}, versao)
     
-    def get_leituras_por_dia(self, data):
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
+    def iter_leituras_periodo(self, inicio, fim, chunk_size=5000):
+        """Leituras (codigo_barras, descricao, data_hora) de [inicio, fim) em blocos.
+        
+        inicio/fim podem ser date ou datetime. O cursor é percorrido com
+        fetchmany, então a memória não cresce com o tamanho do período.
+        """
+        # Intervalo em epoch-ms: busca direta no índice de ts
+        cursor = self._get_conn().cursor()
         cursor.execute('''
-            SELECT p.codigo_barras, p.descricao, l.data_hora
+            SELECT p.codigo_barras, p.descricao, l.ts
             FROM leituras l
-            JOIN produtos p ON l.codigo_barras = p.codigo_barras
-            WHERE DATE(l.data_hora) = ?
-            ORDER BY l.data_hora
-        ''', (data,))
-        result = cursor.fetchall()
-        conn.close()
-        return result
+            JOIN produtos p ON p.id = l.produto_id
+            WHERE l.ts >= ? AND l.ts < ?
+            ORDER BY l.ts
+        ''', (epoch_ms(inicio), epoch_ms(fim)))
+        try:
+            while True:
+                bloco = cursor.fetchmany(chunk_size)
+                if not bloco:
+                    break
+                yield [(codigo, descricao, data_hora_ms(ts)) for codigo, descricao, ts in bloco]
+        finally:
+            cursor.close()
+    
+    def iter_leituras_brutas(self, inicio, fim, chunk_size=100000):
+        """Leituras (produto_id, ts em epoch-ms) de [inicio, fim) em blocos, sem join nem conversão.
+        
+        Para exportações colunares, que juntam o catálogo (get_catalogo_ids) uma vez só.
+        """
+        cursor = self._get_conn().cursor()
+        cursor.execute("SELECT produto_id, ts FROM leituras WHERE ts >= ? AND ts < ? ORDER BY ts",
+                       (epoch_ms(inicio), epoch_ms(fim)))
+        try:
+            while True:
+                bloco = cursor.fetchmany(chunk_size)
+                if not bloco:
+                    break
+                yield bloco
+        finally:
+            cursor.close()
+    
+    def get_catalogo_ids(self):
+        """Produtos (id, codigo_barras, descricao) ordenados por id"""
+        cursor = self._get_conn().cursor()
+        cursor.execute("SELECT id, codigo_barras, descricao FROM produtos ORDER BY id")
+        return cursor.fetchall()
+    
+    def iter_leituras_por_dia(self, data, chunk_size=5000):
+        return self.iter_leituras_periodo(*intervalo_dia(data), chunk_size=chunk_size)
+    
+    def iter_leituras_por_mes(self, ano, mes, chunk_size=5000):
+        return self.iter_leituras_periodo(*intervalo_mes(ano, mes), chunk_size=chunk_size)
+    
+    def get_leituras_periodo(self, inicio, fim):
+        return [linha for bloco in self.iter_leituras_periodo(inicio, fim) for linha in bloco]
+    
+    def contar_leituras(self, inicio, fim):
+        """Quantidade de leituras em [inicio, fim)"""
+        if not isinstance(inicio, datetime) and not isinstance(fim, datetime):
+            return self.get_total_periodo(inicio, fim)
+        cursor = self._get_conn().cursor()
+        cursor.execute("SELECT COUNT(*) FROM leituras WHERE ts >= ? AND ts < ?", (epoch_ms(inicio), epoch_ms(fim)))
+        return cursor.fetchone()[0]
+    
+    def get_watermark(self, inicio, fim):
+        """Marca que muda sempre que as leituras de [inicio, fim) ou o cadastro mudam.
+        
+        Usada como parte da chave do cache de relatórios: períodos fechados
+        mantêm a mesma marca e são servidos do cache.
+        """
+        conn = self._get_conn()
+        # COUNT/MAX(id) saem só do índice de ts (o id já está em cada entrada do índice)
+        total, ultimo_id = conn.execute("SELECT COUNT(*), MAX(id) FROM leituras WHERE ts >= ? AND ts < ?",
+                                        (epoch_ms(inicio), epoch_ms(fim))).fetchone()
+        versao = conn.execute("SELECT valor FROM meta WHERE chave = 'produtos_versao'").fetchone()
+        return f"{total}-{ultimo_id or 0}-{versao[0] if versao else 0}"
+    
+    def get_leituras_por_dia(self, data):
+        return self.get_leituras_periodo(*intervalo_dia(data))
     
     def get_leituras_por_mes(self, ano, mes):
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT p.codigo_barras, p.descricao, l.data_hora
-            FROM leituras l
-            JOIN produtos p ON l.codigo_barras = p.codigo_barras
-            WHERE strftime('%Y', l.data_hora) = ? AND strftime('%m', l.data_hora) = ?
-            ORDER BY l.data_hora
-        ''', (str(ano), f"{mes:02d}"))
-        result = cursor.fetchall()
-        conn.close()
-        return result
\ No newline at end of file
+        return self.get_leituras_periodo(*intervalo_mes(ano, mes))
+
+def epoch_ms(valor):
+    """datetime/date local -> milissegundos desde a época"""
+    if not isinstance(valor, datetime):
+        valor = datetime(valor.year, valor.month, valor.day)
+    # Trunca em ms com aritmética inteira: arredondar poderia jogar 23:59:59.9995 para o dia seguinte
+    return round(valor.replace(microsecond=0).timestamp()) * 1000 + valor.microsecond // 1000
+
+def data_hora_ms(ts):
+    """milissegundos desde a época -> datetime local"""
+    return datetime.fromtimestamp(ts / 1000)
+
+def _turno_da_hora(dia, hora, turnos):
+    """(dia do turno, nome) para uma hora; horas fora dos turnos ficam em 'Sem turno'"""
+    for nome, comeco, termino in turnos:
+        if comeco < termino:
+            if comeco <= hora < termino:
+                return dia, nome
+        elif hora >= comeco:
+            return dia, nome
+        elif hora < termino:
+            return dia - timedelta(days=1), nome
+    return dia, "Sem turno"
+
+def intervalo_dia(data):
+    """[inicio, fim) de um dia 'AAAA-MM-DD'"""
+    inicio = date.fromisoformat(data) if isinstance(data, str) else data
+    return inicio, inicio + timedelta(days=1)
+
+def intervalo_mes(ano, mes):
+    """[inicio, fim) de um mês"""
+    inicio = date(ano, mes, 1)
+    fim = date(ano + 1, 1, 1) if mes == 12 else date(ano, mes + 1, 1)
+    return inicio, fim
+
+# Totais de leituras mantidos a cada inserção (geral, por dia e por hora)
+ROLLUPS = ("leituras_totais", "leituras_diarias", "leituras_horarias")
+
+def _criar_esquema(conn):
+    """Esquema atual; bancos antigos chegam nele pelas MIGRACOES"""
+    # Tabela produtos: id inteiro é a chave usada pelas leituras
+    conn.execute('''
+        CREATE TABLE produtos (
+            id INTEGER PRIMARY KEY,
+            codigo_barras TEXT NOT NULL UNIQUE,
+            descricao TEXT
+        )
+    ''')
+    
+    # Tabela leituras: (produto, instante em epoch-ms)
+    conn.execute('''
+        CREATE TABLE leituras (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            produto_id INTEGER NOT NULL,
+            ts INTEGER NOT NULL,
+            FOREIGN KEY (produto_id) REFERENCES produtos (id)
+        )
+    ''')
+    conn.execute("CREATE INDEX idx_leituras_ts ON leituras (ts)")
+    conn.execute("CREATE INDEX idx_leituras_produto ON leituras (produto_id, ts)")
+    
+    conn.execute('''
+        CREATE TABLE leituras_totais (
+            produto_id INTEGER PRIMARY KEY,
+            total INTEGER NOT NULL
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE leituras_diarias (
+            produto_id INTEGER,
+            dia TEXT,
+            total INTEGER NOT NULL,
+            PRIMARY KEY (dia, produto_id)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+        CREATE TABLE leituras_horarias (
+            produto_id INTEGER,
+            dia TEXT,
+            hora INTEGER,
+            total INTEGER NOT NULL,
+            PRIMARY KEY (dia, hora, produto_id)
+        ) WITHOUT ROWID
+    ''')
+    _criar_orfas(conn)
+    _criar_meta(conn)
+    _criar_busca(conn)
+
+def _criar_orfas(conn):
+    # Leituras de códigos sem cadastro vindas do banco antigo; voltam ao recadastrar o código
+    conn.execute('''
+        CREATE TABLE leituras_orfas (
+            codigo_barras TEXT NOT NULL,
+            ts INTEGER NOT NULL
+        )
+    ''')
+    conn.execute("CREATE INDEX idx_leituras_orfas_codigo ON leituras_orfas (codigo_barras)")
+
+def _criar_meta(conn):
+    # Contadores gerais do banco (ex.: versão do cadastro de produtos)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS meta (
+            chave TEXT PRIMARY KEY,
+            valor INTEGER NOT NULL
+        )
+    ''')
+
+def _criar_busca(conn):
+    """Índice FTS5 das descrições, mantido por triggers; ignorado se o SQLite não tiver FTS5"""
+    try:
+        conn.execute('''
+            CREATE VIRTUAL TABLE produtos_fts USING fts5(
+                descricao, content='produtos', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2'
+            )
+        ''')
+    except sqlite3.OperationalError as e:
+        if "fts5" not in str(e):
+            raise
+        return
+    conn.execute('''
+        CREATE TRIGGER produtos_fts_insert AFTER INSERT ON produtos BEGIN
+            INSERT INTO produtos_fts (rowid, descricao) VALUES (new.id, new.descricao);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER produtos_fts_delete AFTER DELETE ON produtos BEGIN
+            INSERT INTO produtos_fts (produtos_fts, rowid, descricao) VALUES ('delete', old.id, old.descricao);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER produtos_fts_update AFTER UPDATE OF descricao ON produtos BEGIN
+            INSERT INTO produtos_fts (produtos_fts, rowid, descricao) VALUES ('delete', old.id, old.descricao);
+            INSERT INTO produtos_fts (rowid, descricao) VALUES (new.id, new.descricao);
+        END
+    ''')
+    conn.execute("INSERT INTO produtos_fts (produtos_fts) VALUES ('rebuild')")
+
+def _termos_fts(busca):
+    """Texto digitado -> consulta FTS5 de prefixo em todas as palavras ("açu" "cris" -> açúcar cristal)"""
+    return " ".join('"' + palavra.replace('"', '""') + '"*' for palavra in busca.split())
+
+def _fim_prefixo(prefixo):
+    """Menor texto maior que todos os que começam com prefixo, para busca por intervalo no índice"""
+    return prefixo[:-1] + chr(ord(prefixo[-1]) + 1)
+
+def _incrementar_versao_produtos(conn):
+    """Incrementa meta.produtos_versao na transação de conn e retorna o novo valor"""
+    conn.execute('''
+        INSERT INTO meta (chave, valor) VALUES ('produtos_versao', 1)
+        ON CONFLICT (chave) DO UPDATE SET valor = valor + 1
+    ''')
+    return conn.execute("SELECT valor FROM meta WHERE chave = 'produtos_versao'").fetchone()[0]
+
+def _recuperar_orfas(conn, codigos=None):
+    """Move para leituras as órfãs cujo código está cadastrado (só os codigos dados, se houver)"""
+    consulta = "SELECT o.rowid, p.id, o.ts FROM leituras_orfas o JOIN produtos p ON p.codigo_barras = o.codigo_barras"
+    if codigos is None:
+        recuperadas = conn.execute(consulta).fetchall()
+    else:
+        recuperadas = [row for codigo in codigos
+                       for row in conn.execute(consulta + " WHERE o.codigo_barras = ?", (codigo,))]
+    if not recuperadas:
+        return 0
+    conn.executemany("INSERT INTO leituras (produto_id, ts) VALUES (?, ?)",
+                     [(produto_id, ts) for _, produto_id, ts in recuperadas])
+    conn.executemany("DELETE FROM leituras_orfas WHERE rowid = ?", [(rowid,) for rowid, _, _ in recuperadas])
+    _acumular_rollups(conn, [(produto_id, data_hora_ms(ts)) for _, produto_id, ts in recuperadas])
+    return len(recuperadas)
+
+def _acumular_rollups(conn, leituras):
+    totais = Counter()
+    diarias = Counter()
+    horarias = Counter()
+    for produto_id, data_hora in leituras:
+        dia = data_hora.date().isoformat()
+        totais[produto_id] += 1
+        diarias[(produto_id, dia)] += 1
+        horarias[(produto_id, dia, data_hora.hour)] += 1
+    
+    conn.executemany('''
+        INSERT INTO leituras_totais (produto_id, total) VALUES (?, ?)
+        ON CONFLICT (produto_id) DO UPDATE SET total = total + excluded.total
+    ''', totais.items())
+    conn.executemany('''
+        INSERT INTO leituras_diarias (produto_id, dia, total) VALUES (?, ?, ?)
+        ON CONFLICT (dia, produto_id) DO UPDATE SET total = total + excluded.total
+    ''', [(produto_id, dia, total) for (produto_id, dia), total in diarias.items()])
+    conn.executemany('''
+        INSERT INTO leituras_horarias (produto_id, dia, hora, total) VALUES (?, ?, ?, ?)
+        ON CONFLICT (dia, hora, produto_id) DO UPDATE SET total = total + excluded.total
+    ''', [(produto_id, dia, hora, total) for (produto_id, dia, hora), total in horarias.items()])
+
+def _reconstruir_rollups(conn):
+    for tabela in ROLLUPS:
+        conn.execute(f"DELETE FROM {tabela}")
+    conn.execute('''
+        INSERT INTO leituras_totais (produto_id, total)
+        SELECT produto_id, COUNT(*) FROM leituras GROUP BY produto_id
+    ''')
+    # Hora local, igual à usada por _acumular_rollups
+    conn.execute('''
+        INSERT INTO leituras_horarias (produto_id, dia, hora, total)
+        SELECT produto_id, date(ts / 1000, 'unixepoch', 'localtime'),
+               CAST(strftime('%H', ts / 1000, 'unixepoch', 'localtime') AS INTEGER), COUNT(*)
+        FROM leituras GROUP BY 1, 2, 3
+    ''')
+    conn.execute('''
+        INSERT INTO leituras_diarias (produto_id, dia, total)
+        SELECT produto_id, dia, SUM(total) FROM leituras_horarias GROUP BY produto_id, dia
+    ''')
+
+# Migrações de bancos criados por versões anteriores. Cada uma descreve o
+# esquema da sua época e não deve mudar depois de publicada.
+
+def _migracao_indices(conn):
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_leituras_data_hora ON leituras (data_hora)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_leituras_codigo ON leituras (codigo_barras, data_hora)")
+
+def _migracao_rollups(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS leituras_totais (
+            codigo_barras TEXT PRIMARY KEY,
+            total INTEGER NOT NULL
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS leituras_diarias (
+            codigo_barras TEXT,
+            dia TEXT,
+            total INTEGER NOT NULL,
+            PRIMARY KEY (dia, codigo_barras)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS leituras_horarias (
+            codigo_barras TEXT,
+            dia TEXT,
+            hora INTEGER,
+            total INTEGER NOT NULL,
+            PRIMARY KEY (dia, hora, codigo_barras)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+        INSERT INTO leituras_totais (codigo_barras, total)
+        SELECT codigo_barras, COUNT(*) FROM leituras GROUP BY codigo_barras
+    ''')
+    conn.execute('''
+        INSERT INTO leituras_diarias (codigo_barras, dia, total)
+        SELECT codigo_barras, substr(data_hora, 1, 10), COUNT(*)
+        FROM leituras GROUP BY codigo_barras, substr(data_hora, 1, 10)
+    ''')
+    conn.execute('''
+        INSERT INTO leituras_horarias (codigo_barras, dia, hora, total)
+        SELECT codigo_barras, substr(data_hora, 1, 10), CAST(substr(data_hora, 12, 2) AS INTEGER), COUNT(*)
+        FROM leituras GROUP BY codigo_barras, substr(data_hora, 1, 13)
+    ''')
+
+def _texto_para_ms(texto):
+    return epoch_ms(datetime.fromisoformat(texto)) if texto else None
+
+def _migracao_chaves_inteiras(conn):
+    # Leituras de códigos que não existem mais em produtos (ex.: código trocado no
+    # cadastro) não têm produto_id; ficam em leituras_orfas até o código voltar
+    conn.create_function("texto_para_ms", 1, _texto_para_ms, deterministic=True)
+    conn.execute("ALTER TABLE leituras RENAME TO leituras_texto")
+    conn.execute("ALTER TABLE produtos RENAME TO produtos_texto")
+    for tabela in ROLLUPS:
+        conn.execute(f"DROP TABLE {tabela}")
+    
+    # Esquema desta versão (meta e produtos_fts vêm nas migrações seguintes)
+    conn.execute('''
+        CREATE TABLE produtos (
+            id INTEGER PRIMARY KEY,
+            codigo_barras TEXT NOT NULL UNIQUE,
+            descricao TEXT
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE leituras (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            produto_id INTEGER NOT NULL,
+            ts INTEGER NOT NULL,
+            FOREIGN KEY (produto_id) REFERENCES produtos (id)
+        )
+    ''')
+    conn.execute("CREATE INDEX idx_leituras_ts ON leituras (ts)")
+    conn.execute("CREATE INDEX idx_leituras_produto ON leituras (produto_id, ts)")
+    conn.execute('''
+        CREATE TABLE leituras_totais (
+            produto_id INTEGER PRIMARY KEY,
+            total INTEGER NOT NULL
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE leituras_diarias (
+            produto_id INTEGER,
+            dia TEXT,
+            total INTEGER NOT NULL,
+            PRIMARY KEY (dia, produto_id)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+        CREATE TABLE leituras_horarias (
+            produto_id INTEGER,
+            dia TEXT,
+            hora INTEGER,
+            total INTEGER NOT NULL,
+            PRIMARY KEY (dia, hora, produto_id)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+        CREATE TABLE leituras_orfas (
+            codigo_barras TEXT NOT NULL,
+            ts INTEGER NOT NULL
+        )
+    ''')
+    conn.execute("CREATE INDEX idx_leituras_orfas_codigo ON leituras_orfas (codigo_barras)")
+    
+    conn.execute('''
+        INSERT INTO produtos (id, codigo_barras, descricao)
+        SELECT rowid, codigo_barras, descricao FROM produtos_texto
+    ''')
+    conn.execute('''
+        INSERT INTO leituras (id, produto_id, ts)
+        SELECT l.id, p.id, texto_para_ms(l.data_hora)
+        FROM leituras_texto l
+        JOIN produtos p ON p.codigo_barras = l.codigo_barras
+        WHERE l.data_hora IS NOT NULL
+    ''')
+    conn.execute('''
+        INSERT INTO leituras_orfas (codigo_barras, ts)
+        SELECT l.codigo_barras, texto_para_ms(l.data_hora)
+        FROM leituras_texto l
+        WHERE l.data_hora IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM produtos p WHERE p.codigo_barras = l.codigo_barras)
+    ''')
+    conn.execute("DROP TABLE leituras_texto")
+    conn.execute("DROP TABLE produtos_texto")
+    _reconstruir_rollups(conn)
+
+def _migracao_meta(conn):
+    _criar_meta(conn)
+
+def _migracao_busca(conn):
+    _criar_busca(conn)
+
+# Migrações em ordem; a posição + 1 é o user_version resultante
+MIGRACOES = [
+    _migracao_indices,
+    _migracao_rollups,
+    _migracao_chaves_inteiras,
+    _migracao_meta,
+    _migracao_busca,
+]
+
+class LeituraWriter:
+    """Grava leituras em segundo plano, em lotes com um commit por lote"""
+    
+    def __init__(self, db, flush_interval=0.2, batch_size=500, on_error=None):
+        self.db = db
+        self.flush_interval = flush_interval  # espera máxima (s) antes de gravar um lote
+        self.batch_size = batch_size
+        self.on_error = on_error
+        self.queue = queue.Queue()
+        self.thread = None
+        self._stop = threading.Event()
+        # start() durante um close() de outra thread espera o fim dele e recomeça o writer
+        self._lock = threading.Lock()
+    
+    def start(self):
+        with self._lock:
+            if self.thread and self.thread.is_alive():
+                return
+            self._stop.clear()
+            self.thread = threading.Thread(target=self._write_loop)
+            self.thread.daemon = True
+            self.thread.start()
+    
+    def push(self, codigo_barras, data_hora=None):
+        self.queue.put((codigo_barras, data_hora or datetime.now()))
+    
+    def flush(self):
+        """Bloqueia até tudo que já foi enfileirado estar gravado"""
+        if self.thread and self.thread.is_alive():
+            self.queue.join()
+    
+    def close(self):
+        with self._lock:
+            self.flush()
+            self._stop.set()
+            if self.thread:
+                self.thread.join()
+                self.thread = None
+    
+    def _next_batch(self):
+        try:
+            batch = [self.queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+    
+    def _write_loop(self):
+        try:
+            while not (self._stop.is_set() and self.queue.empty()):
+                batch = self._next_batch()
+                if not batch:
+                    continue
+                try:
+                    self.db.add_leituras(batch)
+                except Exception as e:
+                    if self.on_error:
+                        self.on_error(f"Erro ao gravar leituras: {str(e)}", "error")
+                finally:
+                    for _ in batch:
+                        self.queue.task_done()
+        finally:
+            # Cada start() cria uma thread nova; a conexão desta não sobrevive a ela
+            self.db.fechar_conexao_da_thread()
+
+def main():
+    parser = argparse.ArgumentParser(description="Manutenção do banco de leituras")
+    parser.add_argument("--db", default="barcode_reader.db", help="arquivo do banco")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+    subparsers.add_parser("reconstruir-estatisticas",
+                          help="recalcula os totais por código/dia/hora a partir das leituras")
+    args = parser.parse_args()
+    
+    db = Database(args.db)
+    if args.comando == "reconstruir-estatisticas":
+        inicio = time.perf_counter()
+        db.rebuild_rollups()
+        print(f"Estatísticas reconstruídas em {time.perf_counter() - inicio:.2f}s")
+    db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import multiprocessing
+import os
+from collections import deque
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from barcode_reader import decode_frame
+
+# Buffers do anel, anexados uma vez em cada processo trabalhador
+_worker_buffers = []
+
+def _init_worker(shm_names):
+    global _worker_buffers
+    _worker_buffers = [shared_memory.SharedMemory(name=name) for name in shm_names]
+
+def _decode_slot(slot, shape, dtype, rois, roi_margin, symbologies, downscale_width, decoder):
+    # Visão direta sobre a memória compartilhada: o quadro não é serializado
+    frame = np.ndarray(shape, dtype=dtype, buffer=_worker_buffers[slot].buf)
+    return decode_frame(frame, rois, roi_margin, symbologies, downscale_width, decoder)
+
+class DecodePool:
+    """Pool de processos que decodifica quadros gravados num anel de memória compartilhada"""
+    
+    def __init__(self, frame_shape, dtype, workers=None, slots=None):
+        self.shape = tuple(frame_shape)
+        self.dtype = np.dtype(dtype)
+        self.workers = workers or os.cpu_count() or 1
+        self.slots = slots or self.workers * 2
+        
+        nbytes = int(np.prod(self.shape)) * self.dtype.itemsize
+        self._buffers = [shared_memory.SharedMemory(create=True, size=nbytes) for _ in range(self.slots)]
+        self._views = [np.ndarray(self.shape, dtype=self.dtype, buffer=shm.buf) for shm in self._buffers]
+        # spawn: um fork copiaria as threads da GUI/captura e os locks que elas seguram no momento
+        self._pool = multiprocessing.get_context("spawn").Pool(
+            self.workers,
+            initializer=_init_worker,
+            initargs=([shm.name for shm in self._buffers],)
+        )
+        self._pending = deque()  # (AsyncResult, capture_time) na ordem dos quadros
+        self._next_slot = 0
+    
+    def matches(self, frame):
+        return frame.shape == self.shape and frame.dtype == self.dtype
+    
+    def full(self):
+        return len(self._pending) >= self.slots
+    
+    def submit(self, frame, capture_time, rois=None, roi_margin=0.5, symbologies=None,
+               downscale_width=960, decoder='pyzbar'):
+        # Resultados saem em ordem, então o próximo slot do anel está sempre livre
+        if self.full():
+            raise RuntimeError("Anel de quadros cheio")
+        
+        slot = self._next_slot
+        np.copyto(self._views[slot], frame)
+        result = self._pool.apply_async(
+            _decode_slot,
+            (slot, self.shape, self.dtype.str, rois, roi_margin, symbologies, downscale_width, decoder)
+        )
+        self._pending.append((result, capture_time))
+        self._next_slot = (slot + 1) % self.slots
+    
+    def collect(self, wait=False):
+        """Retorna [((decodificados, roi_hit), capture_time)] prontos, sempre na ordem dos quadros"""
+        results = []
+        while self._pending:
+            result, capture_time = self._pending[0]
+            if not result.ready():
+                if not wait:
+                    break
+                result.wait()
+                wait = False
+            self._pending.popleft()
+            results.append((result.get(), capture_time))
+        return results
+    
+    def drain(self):
+        results = []
+        while self._pending:
+            results.extend(self.collect(wait=True))
+        return results
+    
+    def close(self):
+        self._pool.terminate()
+        self._pool.join()
+        self._pending.clear()
+        self._views = []
+        for shm in self._buffers:
+            shm.close()
+            shm.unlink()
+        self._buffers = []
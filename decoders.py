@@ -0,0 +1,137 @@
+import time
+from abc import ABC, abstractmethod
+
+# Simbologias aceitas, já normalizadas (as do zbar; o OpenCV lê um subconjunto delas)
+SYMBOLOGIES = frozenset({
+    'EAN2', 'EAN5', 'EAN8', 'EAN13', 'UPCA', 'UPCE', 'ISBN10', 'ISBN13', 'I25', 'DATABAR', 'DATABAREXP',
+    'CODABAR', 'CODE39', 'CODE93', 'CODE128', 'PDF417', 'QRCODE', 'SQCODE', 'COMPOSITE',
+})
+
+def _normalize_symbology(name):
+    # pyzbar usa 'EAN13', o OpenCV 'EAN_13'
+    return name.replace('_', '').replace('-', '').upper()
+
+def normalize_symbologies(names):
+    """['EAN_13', 'code128'] -> ('EAN13', 'CODE128'); vazio/None = todas.
+    
+    Levanta ValueError para nomes desconhecidos, antes de chegarem a um decodificador.
+    """
+    if not names:
+        return None
+    normalized = tuple(_normalize_symbology(name) for name in names)
+    unknown = [name for name, norm in zip(names, normalized) if norm not in SYMBOLOGIES]
+    if unknown:
+        raise ValueError(f"Simbologia desconhecida: {', '.join(unknown)}")
+    return normalized
+
+class Decoder(ABC):
+    """Interface dos decodificadores: recebe imagem em cinza e retorna [(codigo, rect)]
+    
+    A biblioteca de cada um é importada ao instanciar: sem ela o decodificador
+    só fica de fora de available_decoders().
+    """
+    
+    name = None
+    
+    @abstractmethod
+    def decode(self, gray, symbologies=None):
+        pass
+
+class PyzbarDecoder(Decoder):
+    name = 'pyzbar'
+    
+    def __init__(self):
+        from pyzbar import pyzbar
+        self._pyzbar = pyzbar
+        self._symbols = {_normalize_symbology(symbol.name): symbol for symbol in pyzbar.ZBarSymbol}
+    
+    def decode(self, gray, symbologies=None):
+        symbols = [self._symbols[_normalize_symbology(name)] for name in symbologies] if symbologies else None
+        return [(barcode.data.decode('utf-8'), tuple(barcode.rect)) for barcode in self._pyzbar.decode(gray, symbols)]
+
+class OpenCVDecoder(Decoder):
+    name = 'opencv'
+    
+    def __init__(self):
+        import cv2
+        self._bounding_rect = cv2.boundingRect
+        self.detector = cv2.barcode.BarcodeDetector()
+        # OpenCV >= 4.8 separou a variante que informa o tipo do código
+        self._detect = getattr(self.detector, 'detectAndDecodeWithType', None) or self.detector.detectAndDecode
+    
+    def decode(self, gray, symbologies=None):
+        ok, infos, types, points = self._detect(gray)
+        if not ok or points is None:
+            return []
+        
+        wanted = {_normalize_symbology(name) for name in symbologies} if symbologies else None
+        decoded = []
+        for info, kind, corners in zip(infos, types, points):
+            # Código localizado mas não decodificado vem como string vazia
+            if not info:
+                continue
+            if wanted and _normalize_symbology(str(kind)) not in wanted:
+                continue
+            decoded.append((info, tuple(int(v) for v in self._bounding_rect(corners.astype('float32')))))
+        return decoded
+
+DECODERS = {
+    PyzbarDecoder.name: PyzbarDecoder,
+    OpenCVDecoder.name: OpenCVDecoder,
+}
+
+_instances = {}
+
+def get_decoder(name):
+    """Instância reaproveitada por processo (criar o detector do OpenCV é caro).
+    
+    Aceita também uma instância de Decoder, usada como está.
+    """
+    if isinstance(name, Decoder):
+        return name
+    if name not in _instances:
+        if name not in DECODERS:
+            raise ValueError(f"Decodificador desconhecido: {name}")
+        _instances[name] = DECODERS[name]()
+    return _instances[name]
+
+def available_decoders():
+    names = []
+    for name in DECODERS:
+        try:
+            get_decoder(name)
+            names.append(name)
+        except Exception:
+            pass
+    return names
+
+def benchmark_decoders(frames, min_detection_rate=0.9, symbologies=None, names=None):
+    """Mede cada decodificador nos quadros de amostra e escolhe o mais rápido
+    que detecta ao menos min_detection_rate dos quadros com código.
+    
+    Retorna (nome_escolhido, {nome: {'fps': float, 'detection_rate': float}}).
+    """
+    names = names or available_decoders()
+    hits = {}
+    results = {}
+    
+    for name in names:
+        decoder = get_decoder(name)
+        start = time.perf_counter()
+        hits[name] = [bool(decoder.decode(frame, symbologies)) for frame in frames]
+        elapsed = time.perf_counter() - start
+        results[name] = {'fps': len(frames) / elapsed if elapsed > 0 else float('inf')}
+    
+    # Quadros em que algum decodificador achou código são a referência
+    with_code = [i for i in range(len(frames)) if any(hits[name][i] for name in names)]
+    for name in names:
+        found = sum(1 for i in with_code if hits[name][i])
+        results[name]['detection_rate'] = found / len(with_code) if with_code else 1.0
+    
+    eligible = [name for name in names if results[name]['detection_rate'] >= min_detection_rate]
+    # Nenhum atinge o limite: fica com o que mais detecta
+    if eligible:
+        best = max(eligible, key=lambda name: results[name]['fps'])
+    else:
+        best = max(names, key=lambda name: results[name]['detection_rate'])
+    return best, results
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""Geração de relatórios em lote, sem interface gráfica (ex.: via cron)"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, timedelta
+from database import Database, intervalo_dia, intervalo_mes
+from report_cache import ReportCache
+from report_generator import ReportGenerator
+
+FORMATOS = ('xlsx', 'pdf', 'csv', 'parquet', 'resumo-xlsx', 'resumo-pdf')
+
+# Estado de cada processo do pool: uma conexão e um gerador reaproveitados entre as tarefas
+_gerador = None
+
+def _init_worker(db_path, cache_dir):
+    global _gerador
+    cache = ReportCache(cache_dir) if cache_dir else None
+    _gerador = ReportGenerator(Database(db_path), cache=cache)
+
+def _gerar(periodo, formato, filename):
+    """Gera um relatório; retorna (filename, situação, segundos)"""
+    inicio = time.perf_counter()
+    try:
+        intervalo = intervalo_dia(periodo) if isinstance(periodo, date) else intervalo_mes(*periodo)
+        if formato in ('csv', 'parquet'):
+            gerado = getattr(_gerador, f'exportar_{formato}')(*intervalo, filename)
+        elif formato == 'resumo-xlsx':
+            gerado = _gerador.gerar_resumo_planilha(*intervalo, filename)
+        elif formato == 'resumo-pdf':
+            gerado = _gerador.gerar_resumo_pdf(*intervalo, filename)
+        else:
+            metodo = {'xlsx': 'gerar_planilha', 'pdf': 'gerar_pdf'}[formato]
+            if isinstance(periodo, date):
+                gerado = getattr(_gerador, f'{metodo}_dia')(periodo.isoformat(), filename)
+            else:
+                gerado = getattr(_gerador, f'{metodo}_mes')(*periodo, filename)
+        situacao = 'ok' if gerado else 'sem leituras'
+    except Exception as e:
+        situacao = f'erro: {e}'
+        # Não deixa arquivo pela metade para trás
+        if os.path.exists(filename):
+            os.remove(filename)
+    return filename, situacao, time.perf_counter() - inicio
+
+def _ler_dias(texto):
+    """'2024-01-05' , '2024-01-01:2024-01-31' ou lista separada por vírgulas"""
+    dias = []
+    for parte in texto.split(','):
+        inicio, _, fim = parte.strip().partition(':')
+        dia = date.fromisoformat(inicio)
+        ultimo = date.fromisoformat(fim) if fim else dia
+        while dia <= ultimo:
+            dias.append(dia)
+            dia += timedelta(days=1)
+    return dias
+
+def _ler_mes(texto):
+    ano, mes = texto.split('-')
+    ano, mes = int(ano), int(mes)
+    if not 1 <= mes <= 12:
+        raise ValueError(f"mês inválido: {texto}")
+    return ano, mes
+
+def _ler_meses(texto):
+    """'2024-01', '2024-01:2024-12' ou lista separada por vírgulas"""
+    meses = []
+    for parte in texto.split(','):
+        inicio, _, fim = parte.strip().partition(':')
+        ano, mes = _ler_mes(inicio)
+        ultimo = _ler_mes(fim) if fim else (ano, mes)
+        while (ano, mes) <= ultimo:
+            meses.append((ano, mes))
+            ano, mes = (ano + 1, 1) if mes == 12 else (ano, mes + 1)
+    return meses
+
+def _nome_arquivo(saida, periodo, formato):
+    prefixo, _, extensao = formato.rpartition('-')
+    prefixo = prefixo or 'leituras'
+    if isinstance(periodo, date):
+        nome = f'{prefixo}_{periodo.isoformat()}.{extensao}'
+    else:
+        nome = f'{prefixo}_{periodo[0]}-{periodo[1]:02d}.{extensao}'
+    return os.path.join(saida, nome)
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera relatórios de leituras por dia ou mês, em paralelo")
+    parser.add_argument("--db", default="barcode_reader.db", help="arquivo do banco")
+    parser.add_argument("--dias", type=_ler_dias, default=[],
+                        help="dias (AAAA-MM-DD), intervalos (AAAA-MM-DD:AAAA-MM-DD) separados por vírgula")
+    parser.add_argument("--meses", type=_ler_meses, default=[],
+                        help="meses (AAAA-MM), intervalos (AAAA-MM:AAAA-MM) separados por vírgula")
+    parser.add_argument("--formatos", default="xlsx,pdf",
+                        help=f"formatos separados por vírgula ({', '.join(FORMATOS)})")
+    parser.add_argument("--saida", default=".", help="diretório dos relatórios")
+    parser.add_argument("--processos", type=int, default=None, help="processos em paralelo (padrão: núcleos)")
+    parser.add_argument("--cache", default=None, help="diretório do cache de relatórios (desligado por padrão)")
+    args = parser.parse_args()
+
+    formatos = [f.strip().lower() for f in args.formatos.split(',') if f.strip()]
+    invalidos = [f for f in formatos if f not in FORMATOS]
+    if invalidos:
+        parser.error(f"formato inválido: {', '.join(invalidos)}")
+    # Meses primeiro: as tarefas longas começam cedo e os dias preenchem os processos livres
+    periodos = args.meses + args.dias
+    if not periodos:
+        parser.error("informe --dias e/ou --meses")
+    if not os.path.exists(args.db):
+        print(f"Banco não encontrado: {args.db}")
+        return 1
+
+    # Aplica migrações pendentes uma vez, antes de os processos abrirem o banco
+    Database(args.db).close()
+    os.makedirs(args.saida, exist_ok=True)
+
+    tarefas = [(periodo, formato, _nome_arquivo(args.saida, periodo, formato))
+               for periodo in periodos for formato in formatos]
+    inicio = time.perf_counter()
+    erros = 0
+    with ProcessPoolExecutor(max_workers=args.processos, initializer=_init_worker,
+                             initargs=(args.db, args.cache)) as executor:
+        futuros = [executor.submit(_gerar, *tarefa) for tarefa in tarefas]
+        for futuro in as_completed(futuros):
+            filename, situacao, segundos = futuro.result()
+            if situacao.startswith('erro'):
+                erros += 1
+            print(f"{filename}: {situacao} ({segundos:.2f}s)", flush=True)
+
+    print(f"{len(tarefas)} relatórios, {erros} com erro, em {time.perf_counter() - inicio:.2f}s")
+    return 1 if erros else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,42 @@
 #!/usr/bin/env python3
-import tkinter as tk
-from tkinter import ttk, messagebox, simpledialog, filedialog
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from datetime import datetime
-from database import Database
-from barcode_reader import BarcodeReader
-from report_generator import ReportGenerator
+import startup_timing  # primeiro import: marca o início para o relatório de inicialização
+import argparse
+import bisect
+import multiprocessing
+import queue
+import threading
+import time
+with startup_timing.medir("import tkinter"):
+    import tkinter as tk
+    from tkinter import ttk, messagebox, simpledialog, filedialog
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+with startup_timing.medir("import database"):
+    from database import Database, intervalo_dia, intervalo_mes
+from report_cache import ReportCache
+from catalogo import exportar_catalogo, importar_catalogo
+
+# OpenCV (barcode_reader), matplotlib e reportlab/openpyxl/pandas (report_generator)
+# são importados só quando usados: a janela principal aparece sem esperar por eles
+
+REPORT_WORKERS = 3  # relatórios gerados ao mesmo tempo
+REPORT_EVENTOS_MS = 100  # intervalo de leitura do progresso das tarefas de relatório
+
+# Log de leituras: eventos do leitor entram numa fila e a interface escreve em lotes
+LOG_MAX_LINHAS = 1000     # linhas mantidas no widget; as mais antigas são removidas
+LOG_INTERVALO_MS = 100    # intervalo entre lotes
+LOG_LOTE_MAX = 200        # linhas escritas por lote; o excedente é agrupado
+LOG_FILA_MAX = 10000      # eventos aguardando; acima disso também são agrupados
+LOG_TAGS = {"success": "green", "warning": "orange", "error": "red"}
+
+PRODUTOS_POR_PAGINA = 200  # linhas buscadas por vez na lista de produtos
+BUSCA_ATRASO_MS = 300      # espera após a digitação antes de consultar o banco
+
+PAINEL_INTERVALO_MS = 1000  # atualização do painel de ritmo
+PAINEL_PRODUTOS = 5         # produtos mais lidos com linha própria no painel
+
+STATS_TOP_N = 20              # barras do gráfico; os demais produtos somam em "Outros"
+STATS_ATUALIZACAO_MS = 5000   # releitura dos totais com a janela aberta
 
 class BarcodeApp:
     def __init__(self, root):
@@ -14,12 +44,63 @@ class BarcodeApp:
         self.root.title("Leitor de Códigos de Barras")
         self.root.geometry("600x400")
         
-        self.db = Database()
-        self.reader = BarcodeReader()
-        self.reader.set_callback(self.on_barcode_read)
-        self.report_gen = ReportGenerator(self.db)
+        # Abertos em _iniciar_servicos, depois que a janela aparece
+        self.db = None
+        self.reader = None
+        self.report_gen = None  # criado ao abrir a janela de relatórios
+        # Relatórios rodam fora da thread do Tk; várias exportações podem correr juntas
+        self.report_executor = ThreadPoolExecutor(max_workers=REPORT_WORKERS, thread_name_prefix="relatorio")
+        self.report_jobs = []
+        
+        # Fila preenchida pelas threads do leitor e esvaziada pelo timer do log
+        self.log_queue = queue.Queue(maxsize=LOG_FILA_MAX)
+        self.log_coalescidos = 0
         
         self.setup_ui()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.log_timer = self.root.after(LOG_INTERVALO_MS, self._drenar_log)
+        self.root.after_idle(self._iniciar_servicos)
+    
+    def _iniciar_servicos(self):
+        """Abre o banco e o leitor com a janela já desenhada"""
+        if not self.root.winfo_viewable():
+            self.root.wait_visibility()
+        self.root.update_idletasks()
+        startup_timing.marcar("janela visível", startup_timing.INICIO)
+        
+        inicio = time.perf_counter()
+        try:
+            self.db = Database()
+            startup_timing.marcar("abrir banco", inicio)
+            with startup_timing.medir("import barcode_reader (OpenCV)"):
+                from barcode_reader import BarcodeReader
+            self.reader = BarcodeReader(db=self.db)
+        except Exception as e:
+            messagebox.showerror("Erro", f"Erro ao iniciar: {str(e)}")
+            return
+        self.reader.set_callback(self.on_barcode_read)
+        
+        for botao in self.service_buttons:
+            botao.config(state=tk.NORMAL)
+        startup_timing.marcar("pronto", startup_timing.INICIO)
+        self.log_message(f"Pronto em {startup_timing.etapas[-1][2]:.2f}s")
+    
+    def on_close(self):
+        self.root.after_cancel(self.log_timer)
+        if self.rate_panel is not None:
+            self.rate_panel.parar()
+        # Grava as leituras pendentes e fecha as conexões antes de sair
+        if self.reader is not None and self.reader.is_running():
+            self.reader.stop_reading()
+        # Sem esperar: cancelada, cada tarefa para no próximo bloco e fecha a própria conexão
+        for job in list(self.report_jobs):
+            job.cancel()
+        self.report_executor.shutdown(wait=False, cancel_futures=True)
+        # Só a conexão desta thread: leitor, writer e relatórios fecham as suas ao terminar,
+        # e um relatório cancelado ainda pode estar no meio de uma consulta
+        if self.db is not None:
+            self.db.fechar_conexao_da_thread()
+        self.root.destroy()
     
     def setup_ui(self):
         # Frame principal
@@ -42,7 +123,10 @@ class BarcodeApp:
         
         stats_button = ttk.Button(main_frame, text="Ver Estatísticas", 
                                 command=self.show_stats)
-        stats_button.grid(row=2, column=0, columnspan=2, pady=5, sticky=tk.W+tk.E)
+        stats_button.grid(row=2, column=0, padx=(0, 10), pady=5, sticky=tk.W+tk.E)
+        
+        self.rate_button = ttk.Button(main_frame, text="Mostrar Ritmo", command=self.toggle_rate_panel)
+        self.rate_button.grid(row=2, column=1, padx=(10, 0), pady=5, sticky=tk.W+tk.E)
         
         reports_button = ttk.Button(main_frame, text="Gerar Relatórios", 
                                   command=self.open_reports)
@@ -51,19 +135,29 @@ class BarcodeApp:
         # Status
         self.status_label = ttk.Label(main_frame, text="Status: Parado", 
                                      foreground="red")
-        self.status_label.grid(row=4, column=0, columnspan=2, pady=(20, 10))
+        self.status_label.grid(row=4, column=0, columnspan=2, pady=(20, 0))
+        
+        # Contadores do leitor (quadros decodificados, pulados, ROI)
+        self.reader_stats_label = ttk.Label(main_frame, text="", foreground="gray")
+        self.reader_stats_label.grid(row=5, column=0, columnspan=2, pady=(0, 10))
         
         # Log de leituras
         log_label = ttk.Label(main_frame, text="Log de Leituras:")
-        log_label.grid(row=5, column=0, columnspan=2, sticky=tk.W, pady=(10, 5))
+        log_label.grid(row=6, column=0, sticky=tk.W, pady=(10, 5))
+        
+        # Eventos que chegaram rápido demais e foram agrupados em vez de exibidos
+        self.log_coalescidos_label = ttk.Label(main_frame, text="", foreground="gray")
+        self.log_coalescidos_label.grid(row=6, column=1, sticky=tk.E, pady=(10, 5))
         
         # Frame para o log com scrollbar
         log_frame = ttk.Frame(main_frame)
-        log_frame.grid(row=6, column=0, columnspan=2, sticky=(tk.W, tk.E, tk.N, tk.S), pady=5)
+        log_frame.grid(row=7, column=0, columnspan=2, sticky=(tk.W, tk.E, tk.N, tk.S), pady=5)
         
         self.log_text = tk.Text(log_frame, height=10, width=70)
         scrollbar = ttk.Scrollbar(log_frame, orient="vertical", command=self.log_text.yview)
         self.log_text.configure(yscrollcommand=scrollbar.set)
+        for tag, cor in LOG_TAGS.items():
+            self.log_text.tag_config(tag, foreground=cor)
         
         self.log_text.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
@@ -73,9 +167,31 @@ class BarcodeApp:
         self.root.rowconfigure(0, weight=1)
         main_frame.columnconfigure(0, weight=1)
         main_frame.columnconfigure(1, weight=1)
-        main_frame.rowconfigure(6, weight=1)
+        main_frame.rowconfigure(7, weight=1)
         log_frame.columnconfigure(0, weight=1)
         log_frame.rowconfigure(0, weight=1)
+        
+        # Painel de leituras por minuto, criado na primeira vez que é mostrado
+        self.main_frame = main_frame
+        self.rate_panel = None
+        
+        # Dependem do banco/leitor: habilitados em _iniciar_servicos
+        self.service_buttons = [self.start_button, cadastro_button, stats_button, reports_button, self.rate_button]
+        for botao in self.service_buttons:
+            botao.config(state=tk.DISABLED)
+    
+    def toggle_rate_panel(self):
+        if self.rate_panel is None:
+            self.rate_panel = ThroughputPanel(self.main_frame, self.reader.read_rate)
+            self.rate_panel.widget.grid(row=8, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=5)
+        if self.rate_panel.ativo:
+            self.rate_panel.parar()
+            self.rate_panel.widget.grid_remove()
+            self.rate_button.config(text="Mostrar Ritmo")
+        else:
+            self.rate_panel.widget.grid()
+            self.rate_panel.iniciar()
+            self.rate_button.config(text="Ocultar Ritmo")
     
     def toggle_reading(self):
         if self.reader.is_running():
@@ -95,7 +211,11 @@ class BarcodeApp:
         CadastroWindow(self.root, self.db)
     
     def open_reports(self):
-        ReportsWindow(self.root, self.report_gen)
+        if self.report_gen is None:
+            with startup_timing.medir("import report_generator (reportlab, openpyxl)"):
+                from report_generator import ReportGenerator
+            self.report_gen = ReportGenerator(self.db, cache=ReportCache())
+        ReportsWindow(self.root, self.report_gen, self.report_executor, self.report_jobs)
     
     def show_stats(self):
         stats = self.db.get_leituras_stats()
@@ -103,35 +223,155 @@ class BarcodeApp:
             messagebox.showinfo("Estatísticas", "Nenhuma leitura registrada ainda")
             return
         
-        StatsWindow(self.root, stats)
+        StatsWindow(self.root, self.db, stats)
     
     def on_barcode_read(self, message, msg_type):
-        self.root.after(0, lambda: self.log_message(message, msg_type))
+        # Chamado pelas threads do leitor: só enfileira, a interface escreve no próximo lote
+        try:
+            self.log_queue.put_nowait((message, msg_type))
+        except queue.Full:
+            self.log_coalescidos += 1
     
-    def log_message(self, message, msg_type="info"):
-        self.log_text.insert(tk.END, f"{message}\n")
+    def _drenar_log(self):
+        eventos = []
+        try:
+            while True:
+                eventos.append(self.log_queue.get_nowait())
+        except queue.Empty:
+            pass
+        
+        # Contadores do leitor: só o último do lote interessa
+        stats = [message for message, msg_type in eventos if msg_type == "stats"]
+        if stats:
+            self.reader_stats_label.config(text=stats[-1])
+        linhas = [evento for evento in eventos if evento[1] != "stats"]
+        if len(linhas) > LOG_LOTE_MAX:
+            self.log_coalescidos += len(linhas) - LOG_LOTE_MAX
+            linhas = linhas[-LOG_LOTE_MAX:]
+        if linhas:
+            self._escrever_log(linhas)
+        if self.log_coalescidos:
+            self.log_coalescidos_label.config(text=f"Eventos agrupados: {self.log_coalescidos}")
+        
+        self.log_timer = self.root.after(LOG_INTERVALO_MS, self._drenar_log)
+    
+    def _escrever_log(self, linhas):
+        """Acrescenta as linhas numa única inserção e descarta as mais antigas além de LOG_MAX_LINHAS"""
+        partes = []
+        for message, msg_type in linhas:
+            partes += [f"{message}\n", msg_type if msg_type in LOG_TAGS else ()]
+        self.log_text.insert(tk.END, *partes)
+        
+        total = int(self.log_text.index("end-1c").split(".")[0]) - 1
+        if total > LOG_MAX_LINHAS:
+            self.log_text.delete("1.0", f"{total - LOG_MAX_LINHAS + 1}.0")
         self.log_text.see(tk.END)
-        
-        # Colorir mensagens por tipo
-        if msg_type == "success":
-            self.log_text.tag_add("success", "end-2l", "end-1l")
-            self.log_text.tag_config("success", foreground="green")
-        elif msg_type == "warning":
-            self.log_text.tag_add("warning", "end-2l", "end-1l")
-            self.log_text.tag_config("warning", foreground="orange")
-        elif msg_type == "error":
-            self.log_text.tag_add("error", "end-2l", "end-1l")
-            self.log_text.tag_config("error", foreground="red")
+    
+    def log_message(self, message, msg_type="info"):
+        self._escrever_log([(message, msg_type)])
+
+def _matplotlib():
+    """Figure e FigureCanvasTkAgg, importados na primeira janela ou painel com gráfico"""
+    with startup_timing.medir("import matplotlib"):
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+    return Figure, FigureCanvasTkAgg
+
+class ThroughputPanel:
+    """Leituras por minuto (total e produtos mais lidos) na janela de ReadRateRing.
+    
+    Eixos, grade e legenda ficam num fundo guardado; a cada atualização só as
+    linhas são redesenhadas sobre ele (blitting). O desenho completo acontece só
+    quando a escala ou os produtos da legenda mudam.
+    """
+    
+    def __init__(self, parent, read_rate):
+        Figure, FigureCanvasTkAgg = _matplotlib()
+        self.read_rate = read_rate
+        self.figure = Figure(figsize=(6, 2), dpi=100)
+        self.ax = self.figure.add_subplot()
+        self.x = list(range(1 - read_rate.minutes, 1))
+        self.ax.set_xlim(self.x[0], 0)
+        self.ax.set_ylim(0, 10)
+        self.ax.set_xlabel('Minutos', fontsize=8)
+        self.ax.set_ylabel('Leituras/min', fontsize=8)
+        self.ax.tick_params(labelsize=8)
+        self.ax.grid(alpha=0.3)
+        
+        zeros = [0] * read_rate.minutes
+        self.total_line = self.ax.plot(self.x, zeros, color='black', linewidth=2, label='Total', animated=True)[0]
+        self.code_lines = [self.ax.plot(self.x, zeros, linewidth=1, animated=True)[0] for _ in range(PAINEL_PRODUTOS)]
+        self.codigos = []
+        
+        self.canvas = FigureCanvasTkAgg(self.figure, parent)
+        self.widget = self.canvas.get_tk_widget()
+        self.widget.config(height=200)
+        self.fundo = None
+        self.canvas.mpl_connect('draw_event', self._ao_desenhar)
+        self.ativo = False
+        self.timer = None
+    
+    def iniciar(self):
+        self.ativo = True
+        self.atualizar()
+    
+    def parar(self):
+        self.ativo = False
+        if self.timer is not None:
+            self.widget.after_cancel(self.timer)
+            self.timer = None
+    
+    def _ao_desenhar(self, event):
+        # Desenho completo (inclusive redimensionamento): guarda o fundo sem as linhas
+        self.fundo = self.canvas.copy_from_bbox(self.ax.bbox)
+        self._desenhar_linhas()
+    
+    def _desenhar_linhas(self):
+        for line in [self.total_line] + self.code_lines:
+            if line.get_visible():
+                self.ax.draw_artist(line)
+    
+    def atualizar(self):
+        total, por_codigo = self.read_rate.snapshot()
+        codigos = sorted(por_codigo, key=lambda codigo: sum(por_codigo[codigo]), reverse=True)[:PAINEL_PRODUTOS]
+        
+        self.total_line.set_ydata(total)
+        for i, line in enumerate(self.code_lines):
+            line.set_visible(i < len(codigos))
+            if i < len(codigos):
+                line.set_ydata(por_codigo[codigos[i]])
+                line.set_label(codigos[i])
+        
+        maior = max(total)
+        limite = self.ax.get_ylim()[1]
+        if codigos != self.codigos or maior > limite or (limite > 10 and maior < limite / 4):
+            # Escala ou legenda mudou: desenho completo, que recaptura o fundo
+            self.codigos = codigos
+            self.ax.set_ylim(0, max(10, maior * 1.3))
+            self.ax.legend(handles=[self.total_line] + self.code_lines[:len(codigos)], loc='upper left', fontsize=7)
+            self.canvas.draw()
+        elif self.fundo is not None:
+            self.canvas.restore_region(self.fundo)
+            self._desenhar_linhas()
+            self.canvas.blit(self.ax.bbox)
+        
+        self.timer = self.widget.after(PAINEL_INTERVALO_MS, self.atualizar)
 
 class CadastroWindow:
     def __init__(self, parent, db):
         self.db = db
         self.window = tk.Toplevel(parent)
         self.window.title("Cadastro de Produtos")
-        self.window.geometry("400x300")
+        self.window.geometry("500x300")
         self.window.transient(parent)
         self.window.grab_set()
         
+        # Códigos já carregados na lista, em ordem: posicionam inserções sem recarregar
+        self.codigos = []
+        self.fim_lista = False
+        self.carregando = False
+        self.busca_timer = None
+        
         self.setup_ui()
         self.load_produtos()
     
@@ -150,8 +390,11 @@ class CadastroWindow:
         
         ttk.Button(main_frame, text="Cadastrar", command=self.cadastrar).grid(row=2, column=0, columnspan=2, pady=10)
         
-        # Lista de produtos
-        ttk.Label(main_frame, text="Produtos Cadastrados:").grid(row=3, column=0, columnspan=2, sticky=tk.W, pady=(20, 5))
+        # Lista de produtos, com busca por prefixo do código ou de palavras da descrição
+        ttk.Label(main_frame, text="Produtos Cadastrados:").grid(row=3, column=0, sticky=tk.W, pady=(20, 5))
+        self.busca_var = tk.StringVar()
+        self.busca_var.trace_add("write", lambda *args: self._agendar_busca())
+        ttk.Entry(main_frame, textvariable=self.busca_var, width=30).grid(row=3, column=1, padx=(10, 0), pady=(20, 5))
         
         # Treeview para lista
         self.tree = ttk.Treeview(main_frame, columns=("codigo", "descricao"), show="headings", height=6)
@@ -167,11 +410,13 @@ class CadastroWindow:
         
         ttk.Button(btn_frame, text="Editar", command=self.editar_produto).pack(side=tk.LEFT, padx=5)
         ttk.Button(btn_frame, text="Deletar", command=self.deletar_produto).pack(side=tk.LEFT, padx=5)
+        ttk.Button(btn_frame, text="Importar...", command=self.importar).pack(side=tk.LEFT, padx=5)
+        ttk.Button(btn_frame, text="Exportar...", command=self.exportar).pack(side=tk.LEFT, padx=5)
         
-        # Scrollbar para treeview
-        scrollbar = ttk.Scrollbar(main_frame, orient="vertical", command=self.tree.yview)
-        self.tree.configure(yscrollcommand=scrollbar.set)
-        scrollbar.grid(row=4, column=2, sticky=(tk.N, tk.S))
+        # Scrollbar para treeview; chegar perto do fim carrega a próxima página
+        self.scrollbar = ttk.Scrollbar(main_frame, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self._rolar)
+        self.scrollbar.grid(row=4, column=2, sticky=(tk.N, tk.S))
         
         main_frame.columnconfigure(1, weight=1)
         main_frame.rowconfigure(4, weight=1)
@@ -188,17 +433,62 @@ class CadastroWindow:
             messagebox.showinfo("Sucesso", "Produto cadastrado com sucesso")
             self.codigo_entry.delete(0, tk.END)
             self.descricao_entry.delete(0, tk.END)
-            self.load_produtos()
+            self._mostrar_produto(codigo)
         else:
             messagebox.showerror("Erro", "Código já cadastrado")
     
     def load_produtos(self):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
-        produtos = self.db.get_produtos()
-        for codigo, descricao in produtos:
-            self.tree.insert("", tk.END, values=(codigo, descricao or "Sem descrição"))
+        """Recomeça a lista (ou a busca) pela primeira página"""
+        self.tree.delete(*self.tree.get_children())
+        self.codigos = []
+        self.fim_lista = False
+        self._carregar_pagina()
+    
+    def _carregar_pagina(self):
+        self.carregando = False
+        if self.fim_lista:
+            return
+        apos = self.codigos[-1] if self.codigos else None
+        pagina = self.db.get_produtos_pagina(apos, PRODUTOS_POR_PAGINA, self.busca_var.get())
+        self.fim_lista = len(pagina) < PRODUTOS_POR_PAGINA
+        for produto_id, codigo, descricao in pagina:
+            self.tree.insert("", tk.END, iid=str(produto_id), values=(codigo, descricao or "Sem descrição"))
+            self.codigos.append(codigo)
+    
+    def _rolar(self, primeiro, ultimo):
+        self.scrollbar.set(primeiro, ultimo)
+        if float(ultimo) >= 0.95 and not self.fim_lista and not self.carregando:
+            # Fora do callback de rolagem: inserir aqui dispararia outro callback
+            self.carregando = True
+            self.window.after_idle(self._carregar_pagina)
+    
+    def _agendar_busca(self):
+        if self.busca_timer is not None:
+            self.window.after_cancel(self.busca_timer)
+        self.busca_timer = self.window.after(BUSCA_ATRASO_MS, self.load_produtos)
+    
+    def _mostrar_produto(self, codigo):
+        """Insere a linha do produto na sua posição, sem recarregar a lista"""
+        if self.busca_var.get().strip():
+            # Com busca ativa o filtro é do banco: refaz só a primeira página
+            self.load_produtos()
+            return
+        produto = self.db.get_produto(codigo)
+        if produto is None:
+            return
+        produto_id, codigo, descricao = produto
+        posicao = bisect.bisect_left(self.codigos, codigo)
+        if posicao == len(self.codigos) and not self.fim_lista:
+            return  # depois da última página carregada: aparece ao rolar
+        self.codigos.insert(posicao, codigo)
+        self.tree.insert("", posicao, iid=str(produto_id), values=(codigo, descricao or "Sem descrição"))
+        self.tree.selection_set(str(produto_id))
+        self.tree.see(str(produto_id))
+    
+    def _remover_linha(self, item):
+        codigo = self.tree.set(item, "codigo")
+        del self.codigos[bisect.bisect_left(self.codigos, codigo)]
+        self.tree.delete(item)
     
     def editar_produto(self):
         selected = self.tree.selection()
@@ -206,8 +496,10 @@ class CadastroWindow:
             messagebox.showwarning("Aviso", "Selecione um produto para editar")
             return
         
-        item = self.tree.item(selected[0])
-        codigo_atual, descricao_atual = item['values']
+        # tree.set devolve o texto da célula (item()['values'] converteria "001" em 1)
+        item = selected[0]
+        codigo_atual = self.tree.set(item, "codigo")
+        descricao_atual = self.tree.set(item, "descricao")
         
         # Janela de edição
         edit_window = tk.Toplevel(self.window)
@@ -237,78 +529,209 @@ class CadastroWindow:
             if self.db.update_produto(codigo_atual, novo_codigo, nova_desc):
                 messagebox.showinfo("Sucesso", "Produto atualizado")
                 edit_window.destroy()
-                self.load_produtos()
+                self._remover_linha(item)
+                self._mostrar_produto(novo_codigo)
             else:
                 messagebox.showerror("Erro", "Código já existe")
         
         ttk.Button(edit_window, text="Salvar", command=salvar).grid(row=2, column=0, columnspan=2, pady=10)
     
+    def importar(self):
+        filename = filedialog.askopenfilename(
+            parent=self.window,
+            filetypes=[("Planilhas", "*.csv *.xlsx"), ("CSV", "*.csv"), ("Excel files", "*.xlsx")]
+        )
+        if not filename:
+            return
+        
+        try:
+            resultado = importar_catalogo(self.db, filename)
+        except Exception as e:
+            messagebox.showerror("Erro", f"Erro ao importar catálogo: {str(e)}", parent=self.window)
+            return
+        
+        messagebox.showinfo(
+            "Importação concluída",
+            f"Inseridos: {resultado['inseridos']}\n"
+            f"Atualizados: {resultado['atualizados']}\n"
+            f"Duplicados: {resultado['duplicados']}\n"
+            f"Rejeitados: {resultado['rejeitados']}",
+            parent=self.window
+        )
+        self.load_produtos()
+    
+    def exportar(self):
+        filename = filedialog.asksaveasfilename(
+            parent=self.window,
+            defaultextension=".csv",
+            filetypes=[("CSV", "*.csv"), ("Excel files", "*.xlsx")]
+        )
+        if not filename:
+            return
+        
+        try:
+            total = exportar_catalogo(self.db, filename)
+            messagebox.showinfo("Sucesso", f"{total} produtos exportados", parent=self.window)
+        except Exception as e:
+            messagebox.showerror("Erro", f"Erro ao exportar catálogo: {str(e)}", parent=self.window)
+    
     def deletar_produto(self):
         selected = self.tree.selection()
         if not selected:
             messagebox.showwarning("Aviso", "Selecione um produto para deletar")
             return
         
-        item = self.tree.item(selected[0])
-        codigo = item['values'][0]
+        item = selected[0]
+        codigo = self.tree.set(item, "codigo")
         
         if messagebox.askyesno("Confirmar", f"Deletar produto {codigo}?\nTodas as leituras serão removidas."):
             self.db.delete_produto(codigo)
             messagebox.showinfo("Sucesso", "Produto deletado")
-            self.load_produtos()
+            self._remover_linha(item)
 
 class StatsWindow:
-    def __init__(self, parent, stats):
+    def __init__(self, parent, db, stats=None):
+        self.db = db
         self.window = tk.Toplevel(parent)
         self.window.title("Estatísticas de Leitura")
         self.window.geometry("800x600")
         self.window.transient(parent)
         
-        self.create_chart(stats)
-    
-    def create_chart(self, stats):
-        # Preparar dados
-        codigos = [row[0] for row in stats]
-        leituras = [row[2] for row in stats]
-        
-        # Criar gráfico de colunas verticais
-        fig, ax = plt.subplots(figsize=(12, 8))
-        bars = ax.bar(range(len(codigos)), leituras, color='steelblue', edgecolor='darkblue', width=0.6)
-        
-        # Configurar eixos
-        ax.set_xlabel('Códigos de Barras', fontsize=12)
-        ax.set_ylabel('Quantidade de Leituras', fontsize=12)
-        ax.set_title('Estatísticas de Leitura por Código', fontsize=14, fontweight='bold')
-        
-        # Configurar labels do eixo X
-        ax.set_xticks(range(len(codigos)))
-        ax.set_xticklabels(codigos, rotation=45, ha='right')
-        
-        # Adicionar valores no topo das colunas
-        for i, (bar, value) in enumerate(zip(bars, leituras)):
-            ax.text(i, value + 0.1, str(value), ha='center', va='bottom', fontweight='bold')
+        # Artistas do gráfico, reaproveitados a cada atualização
+        self.bars = []
+        self.valores = []
+        self.timer = None
+        self.filtro = (None, STATS_TOP_N)  # último (período, top) válido
         
-        # Ajustar grid
-        ax.grid(axis='y', alpha=0.3)
-        ax.set_axisbelow(True)
-        
-        plt.tight_layout()
-        
-        # Integrar com Tkinter
-        canvas = FigureCanvasTkAgg(fig, self.window)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.setup_ui()
+        self.create_chart()
+        self.atualizar(stats)
+        self.window.bind("<Destroy>", self.on_destroy)
+    
+    def setup_ui(self):
+        filtros = ttk.Frame(self.window, padding="5")
+        filtros.pack(fill=tk.X)
+        
+        ttk.Label(filtros, text="De (AAAA-MM-DD):").pack(side=tk.LEFT)
+        self.inicio_entry = ttk.Entry(filtros, width=12)
+        self.inicio_entry.pack(side=tk.LEFT, padx=(5, 10))
+        ttk.Label(filtros, text="Até:").pack(side=tk.LEFT)
+        self.fim_entry = ttk.Entry(filtros, width=12)
+        self.fim_entry.pack(side=tk.LEFT, padx=(5, 10))
+        ttk.Label(filtros, text="Top:").pack(side=tk.LEFT)
+        self.top_var = tk.IntVar(value=STATS_TOP_N)
+        ttk.Spinbox(filtros, from_=1, to=100, width=5, textvariable=self.top_var).pack(side=tk.LEFT, padx=(5, 10))
+        ttk.Button(filtros, text="Atualizar", command=lambda: self.atualizar(interativo=True)).pack(side=tk.LEFT)
+    
+    def create_chart(self):
+        # Figure direto, sem pyplot: nada fica registrado globalmente e a figura
+        # é liberada junto com a janela
+        Figure, FigureCanvasTkAgg = _matplotlib()
+        self.figure = Figure(figsize=(8, 6))
+        self.ax = self.figure.add_subplot()
+        self.ax.set_xlabel('Códigos de Barras', fontsize=12)
+        self.ax.set_ylabel('Quantidade de Leituras', fontsize=12)
+        self.ax.set_title('Estatísticas de Leitura por Código', fontsize=14, fontweight='bold')
+        self.ax.grid(axis='y', alpha=0.3)
+        self.ax.set_axisbelow(True)
+        
+        self.canvas = FigureCanvasTkAgg(self.figure, self.window)
+        self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+    
+    def _ler_periodo(self):
+        """(inicio, fim) do filtro, fim exclusivo; None para todo o histórico"""
+        inicio, fim = self.inicio_entry.get().strip(), self.fim_entry.get().strip()
+        if not inicio and not fim:
+            return None
+        inicio = date.fromisoformat(inicio) if inicio else date.min
+        fim = date.fromisoformat(fim) + timedelta(days=1) if fim else date.max
+        return inicio, fim
+    
+    def atualizar(self, stats=None, interativo=False):
+        if self.timer is not None:
+            self.window.after_cancel(self.timer)
+        try:
+            self.filtro = (self._ler_periodo(), max(1, int(self.top_var.get())))
+        except (ValueError, tk.TclError):
+            # Pelo timer o filtro pode estar no meio da digitação: segue com o último válido
+            if interativo:
+                messagebox.showerror("Erro", "Filtro inválido", parent=self.window)
+        periodo, top = self.filtro
+        
+        if stats is None:
+            stats = self.db.get_totais_periodo(*periodo) if periodo else self.db.get_leituras_stats()
+        
+        # Maiores primeiro; o restante vira uma barra "Outros"
+        codigos = [row[0] for row in stats[:top]]
+        leituras = [row[2] for row in stats[:top]]
+        outros = sum(row[2] for row in stats[top:])
+        if outros:
+            codigos.append('Outros')
+            leituras.append(outros)
+        self.desenhar(codigos, leituras, bool(outros))
+        
+        self.timer = self.window.after(STATS_ATUALIZACAO_MS, self.atualizar)
+    
+    def desenhar(self, codigos, leituras, com_outros=False):
+        # Barras e rótulos só são criados quando a quantidade aumenta; depois, atualizados no lugar
+        while len(self.bars) < len(codigos):
+            posicao = len(self.bars)
+            self.bars.append(self.ax.bar(posicao, 0, color='steelblue', edgecolor='darkblue', width=0.6)[0])
+            self.valores.append(self.ax.text(posicao, 0, '', ha='center', va='bottom', fontweight='bold'))
+        
+        maior = max(leituras, default=0)
+        for i, (bar, texto) in enumerate(zip(self.bars, self.valores)):
+            visivel = i < len(codigos)
+            bar.set_visible(visivel)
+            texto.set_visible(visivel)
+            if visivel:
+                bar.set_height(leituras[i])
+                bar.set_facecolor('gray' if com_outros and i == len(codigos) - 1 else 'steelblue')
+                texto.set_text(str(leituras[i]))
+                texto.set_y(leituras[i] + maior * 0.01)
+        
+        self.ax.set_xticks(range(len(codigos)))
+        self.ax.set_xticklabels(codigos, rotation=45, ha='right')
+        self.ax.set_xlim(-0.5, max(len(codigos), 1) - 0.5)
+        self.ax.set_ylim(0, max(maior * 1.1, 1))
+        self.figure.tight_layout()
+        self.canvas.draw_idle()
+    
+    def on_destroy(self, event):
+        if event.widget is self.window and self.timer is not None:
+            self.window.after_cancel(self.timer)
+            self.timer = None
+
+class ReportJob:
+    """Geração de relatório executada no pool de tarefas, com progresso e cancelamento"""
+    
+    def __init__(self, descricao, gerar, filename):
+        self.descricao = descricao
+        self.gerar = gerar  # gerar(filename, progresso=..., cancelado=...) -> bool
+        self.filename = filename
+        self.cancelado = threading.Event()
+        self.future = None
+    
+    def cancel(self):
+        self.cancelado.set()
+        if self.future:
+            self.future.cancel()  # ainda na fila: nem começa
 
 class ReportsWindow:
-    def __init__(self, parent, report_gen):
+    def __init__(self, parent, report_gen, executor, jobs):
         self.report_gen = report_gen
+        self.executor = executor
+        self.jobs = jobs  # tarefas em andamento, canceladas ao fechar o app
         self.window = tk.Toplevel(parent)
         self.window.title("Gerar Relatórios")
-        self.window.geometry("400x300")
+        self.window.geometry("460x520")
         self.window.transient(parent)
-        self.window.grab_set()
+        # Progresso e conclusão das tarefas: (job, feitas, total, status, erro); feitas None = concluída
+        self.eventos = queue.Queue()
         
         self.setup_ui()
+        self.timer = self.window.after(REPORT_EVENTOS_MS, self._drenar_eventos)
+        self.window.bind("<Destroy>", self.on_destroy)
     
     def setup_ui(self):
         main_frame = ttk.Frame(self.window, padding="20")
@@ -341,67 +764,224 @@ class ReportsWindow:
         
         # Botões
         btn_frame = ttk.Frame(main_frame)
-        btn_frame.pack(fill=tk.X, pady=(20, 0))
+        btn_frame.pack(fill=tk.X, pady=(0, 20))
         
         ttk.Button(btn_frame, text="Gerar Excel", command=self.gerar_excel).pack(side=tk.LEFT, padx=(0, 10))
-        ttk.Button(btn_frame, text="Gerar PDF", command=self.gerar_pdf).pack(side=tk.LEFT)
+        ttk.Button(btn_frame, text="Gerar PDF", command=self.gerar_pdf).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Button(btn_frame, text="Exportar Dados", command=self.exportar_dados).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Button(btn_frame, text="Gerar Resumo", command=self.gerar_resumo).pack(side=tk.LEFT)
+        
+        # Tarefas em andamento
+        self.jobs_frame = ttk.LabelFrame(main_frame, text="Tarefas", padding="10")
+        self.jobs_frame.pack(fill=tk.BOTH, expand=True)
+        self.jobs_frame.columnconfigure(1, weight=1)
+        self.job_row = 0
     
     def gerar_excel(self):
         try:
-            filename = filedialog.asksaveasfilename(
-                defaultextension=".xlsx",
-                filetypes=[("Excel files", "*.xlsx")]
-            )
-            
-            if not filename:
-                return
-            
             if self.period_var.get() == "dia":
                 data = self.date_entry.get()
-                success = self.report_gen.gerar_planilha_dia(data, filename)
-            else:
-                mes_ano = self.month_entry.get().split("/")
-                mes, ano = int(mes_ano[0]), int(mes_ano[1])
-                success = self.report_gen.gerar_planilha_mes(ano, mes, filename)
-            
-            if success:
-                messagebox.showinfo("Sucesso", "Planilha gerada com sucesso!")
+                descricao = f"Excel {data}"
+                gerar = lambda filename, **kw: self.report_gen.gerar_planilha_dia(data, filename, **kw)
             else:
-                messagebox.showwarning("Aviso", "Nenhum dado encontrado para o período selecionado")
+                mes, ano = self._ler_mes()
+                descricao = f"Excel {mes:02d}/{ano}"
+                gerar = lambda filename, **kw: self.report_gen.gerar_planilha_mes(ano, mes, filename, **kw)
+        except ValueError:
+            messagebox.showerror("Erro", "Data inválida", parent=self.window)
+            return
         
-        except Exception as e:
-            messagebox.showerror("Erro", f"Erro ao gerar planilha: {str(e)}")
+        filename = filedialog.asksaveasfilename(
+            parent=self.window,
+            defaultextension=".xlsx",
+            filetypes=[("Excel files", "*.xlsx")]
+        )
+        if filename:
+            self.iniciar(ReportJob(descricao, gerar, filename))
     
     def gerar_pdf(self):
         try:
-            filename = filedialog.asksaveasfilename(
-                defaultextension=".pdf",
-                filetypes=[("PDF files", "*.pdf")]
-            )
-            
-            if not filename:
-                return
-            
             if self.period_var.get() == "dia":
                 data = self.date_entry.get()
-                success = self.report_gen.gerar_pdf_dia(data, filename)
+                descricao = f"PDF {data}"
+                gerar = lambda filename, **kw: self.report_gen.gerar_pdf_dia(data, filename, **kw)
             else:
-                mes_ano = self.month_entry.get().split("/")
-                mes, ano = int(mes_ano[0]), int(mes_ano[1])
-                success = self.report_gen.gerar_pdf_mes(ano, mes, filename)
-            
-            if success:
-                messagebox.showinfo("Sucesso", "PDF gerado com sucesso!")
+                mes, ano = self._ler_mes()
+                descricao = f"PDF {mes:02d}/{ano}"
+                gerar = lambda filename, **kw: self.report_gen.gerar_pdf_mes(ano, mes, filename, **kw)
+        except ValueError:
+            messagebox.showerror("Erro", "Data inválida", parent=self.window)
+            return
+        
+        filename = filedialog.asksaveasfilename(
+            parent=self.window,
+            defaultextension=".pdf",
+            filetypes=[("PDF files", "*.pdf")]
+        )
+        if filename:
+            self.iniciar(ReportJob(descricao, gerar, filename))
+    
+    def exportar_dados(self):
+        """Leituras brutas em CSV ou Parquet, conforme a extensão escolhida"""
+        try:
+            periodo, inicio, fim = self._ler_intervalo()
+        except ValueError:
+            messagebox.showerror("Erro", "Data inválida", parent=self.window)
+            return
+        
+        filename = filedialog.asksaveasfilename(
+            parent=self.window,
+            defaultextension=".csv",
+            filetypes=[("CSV", "*.csv"), ("Parquet", "*.parquet")]
+        )
+        if not filename:
+            return
+        if filename.lower().endswith(".parquet"):
+            descricao = f"Parquet {periodo}"
+            gerar = lambda filename, **kw: self.report_gen.exportar_parquet(inicio, fim, filename, **kw)
+        else:
+            descricao = f"CSV {periodo}"
+            gerar = lambda filename, **kw: self.report_gen.exportar_csv(inicio, fim, filename, **kw)
+        self.iniciar(ReportJob(descricao, gerar, filename))
+    
+    def gerar_resumo(self):
+        """Totais por produto, hora e turno em Excel ou PDF, conforme a extensão escolhida"""
+        try:
+            periodo, inicio, fim = self._ler_intervalo()
+        except ValueError:
+            messagebox.showerror("Erro", "Data inválida", parent=self.window)
+            return
+        
+        filename = filedialog.asksaveasfilename(
+            parent=self.window,
+            defaultextension=".xlsx",
+            filetypes=[("Excel files", "*.xlsx"), ("PDF files", "*.pdf")]
+        )
+        if not filename:
+            return
+        if filename.lower().endswith(".pdf"):
+            descricao = f"Resumo PDF {periodo}"
+            gerar = lambda filename, **kw: self.report_gen.gerar_resumo_pdf(inicio, fim, filename, **kw)
+        else:
+            descricao = f"Resumo Excel {periodo}"
+            gerar = lambda filename, **kw: self.report_gen.gerar_resumo_planilha(inicio, fim, filename, **kw)
+        self.iniciar(ReportJob(descricao, gerar, filename))
+    
+    def _ler_intervalo(self):
+        """(texto do período, inicio, fim) conforme a seleção de dia ou mês"""
+        if self.period_var.get() == "dia":
+            periodo = self.date_entry.get()
+            return (periodo, *intervalo_dia(periodo))
+        mes, ano = self._ler_mes()
+        return (f"{mes:02d}/{ano}", *intervalo_mes(ano, mes))
+    
+    def _ler_mes(self):
+        mes_ano = self.month_entry.get().split("/")
+        mes, ano = int(mes_ano[0]), int(mes_ano[1])
+        if not 1 <= mes <= 12:
+            raise ValueError(mes)
+        return mes, ano
+    
+    def iniciar(self, job):
+        # Linha da tarefa: descrição, barra de progresso, status e cancelar
+        row = self.job_row
+        self.job_row += 1
+        ttk.Label(self.jobs_frame, text=job.descricao).grid(row=row, column=0, sticky=tk.W, padx=(0, 10))
+        job.barra = ttk.Progressbar(self.jobs_frame, mode="determinate", maximum=1)
+        job.barra.grid(row=row, column=1, sticky=tk.W+tk.E, pady=2)
+        job.status = ttk.Label(self.jobs_frame, text="Na fila", width=12)
+        job.status.grid(row=row, column=2, padx=5)
+        job.botao = ttk.Button(self.jobs_frame, text="Cancelar", command=job.cancel)
+        job.botao.grid(row=row, column=3)
+        
+        self.jobs.append(job)
+        job.future = self.executor.submit(self._executar, job)
+        job.future.add_done_callback(lambda future: self._concluida(job, future))
+    
+    def _executar(self, job):
+        self.eventos.put((job, 0, 1, "Gerando", None))
+        progresso = lambda feitas, total: self.eventos.put((job, feitas, total, "Gerando", None))
+        try:
+            return job.gerar(job.filename, progresso=progresso, cancelado=job.cancelado)
+        finally:
+            # A conexão fecha com a tarefa, não com o app: ao sair ela pode estar em uso
+            self.report_gen.db.fechar_conexao_da_thread()
+    
+    def _concluida(self, job, future):
+        from report_generator import RelatorioCancelado  # já carregado ao abrir a janela
+        erro = None
+        if future.cancelled():
+            status = "Cancelado"
+        elif isinstance(future.exception(), RelatorioCancelado):
+            status = "Cancelado"
+        elif future.exception() is not None:
+            status = "Erro"
+            erro = f"Erro ao gerar {job.descricao}: {str(future.exception())}"
+        elif future.result():
+            status = "Concluído"
+        else:
+            status = "Sem dados"
+        
+        if job in self.jobs:
+            self.jobs.remove(job)
+        self.eventos.put((job, None, None, status, erro))
+    
+    def _drenar_eventos(self):
+        # Threads do pool só enfileiram; o Tk é tocado aqui, na thread principal
+        ultimos = {}
+        try:
+            while True:
+                evento = self.eventos.get_nowait()
+                # Do progresso só o último importa; a conclusão é sempre o último evento da tarefa
+                ultimos[evento[0]] = evento
+        except queue.Empty:
+            pass
+        
+        erros = []
+        for job, feitas, total, status, erro in ultimos.values():
+            if feitas is None:
+                self._finalizar(job, status)
+                if erro:
+                    erros.append(erro)
             else:
-                messagebox.showwarning("Aviso", "Nenhum dado encontrado para o período selecionado")
+                self._atualizar(job, feitas, total, status)
+        for erro in erros:
+            messagebox.showerror("Erro", erro, parent=self.window)
         
-        except Exception as e:
-            messagebox.showerror("Erro", f"Erro ao gerar PDF: {str(e)}")
+        # A janela pode ter sido fechada enquanto a mensagem de erro estava aberta
+        if self.window.winfo_exists():
+            self.timer = self.window.after(REPORT_EVENTOS_MS, self._drenar_eventos)
+    
+    def on_destroy(self, event):
+        if event.widget is self.window and self.timer is not None:
+            self.window.after_cancel(self.timer)
+            self.timer = None
+    
+    def _atualizar(self, job, feitas, total, status):
+        job.barra.config(maximum=max(total, 1), value=feitas)
+        job.status.config(text=status)
+    
+    def _finalizar(self, job, status):
+        if status == "Concluído":
+            job.barra.config(value=job.barra.cget("maximum"))
+        job.status.config(text=status)
+        job.botao.config(state=tk.DISABLED)
 
 def main():
+    parser = argparse.ArgumentParser(description="Leitor de códigos de barras")
+    parser.add_argument("--tempo-inicio", action="store_true",
+                        help="mostra no terminal o tempo de cada etapa da inicialização e dos imports sob demanda")
+    args = parser.parse_args()
+    if args.tempo_inicio:
+        print(startup_timing.relatorio())
+        startup_timing.saida = print
+    
+    inicio = time.perf_counter()
     root = tk.Tk()
     app = BarcodeApp(root)
+    startup_timing.marcar("criar janela", inicio)
     root.mainloop()
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # pool de decodificação no executável do PyInstaller
     main()
\ No newline at end of file
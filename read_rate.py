@@ -0,0 +1,61 @@
+"""Contador de leituras por minuto em memória, sem dependências de câmera ou banco"""
+
+import threading
+import time
+from array import array
+
+READ_RATE_MINUTES = 30   # janela do contador de leituras por minuto
+
+class ReadRateRing:
+    """Leituras por minuto dos últimos `minutes` minutos, total e por produto.
+    
+    Cada série é um array de inteiros usado como anel (índice = minuto % minutes);
+    registrar uma leitura custa um incremento, sem tocar no banco.
+    """
+    
+    def __init__(self, minutes=READ_RATE_MINUTES):
+        self.minutes = minutes
+        self.lock = threading.Lock()
+        self.total = self._novo_anel()
+        self.per_code = {}      # {codigo: anel}
+        self.current_minute = None
+    
+    def _novo_anel(self):
+        return array('I', bytes(4 * self.minutes))
+    
+    def add(self, code, timestamp):
+        minute = int(timestamp // 60)
+        with self.lock:
+            self._advance(minute)
+            if minute < self.current_minute - self.minutes + 1:
+                return  # mais antiga que a janela
+            i = minute % self.minutes
+            ring = self.per_code.get(code)
+            if ring is None:
+                ring = self.per_code[code] = self._novo_anel()
+            ring[i] += 1
+            self.total[i] += 1
+    
+    def _advance(self, minute):
+        # Zera os minutos que saíram da janela e descarta produtos sem leituras nela
+        if self.current_minute is None:
+            self.current_minute = minute
+            return
+        if minute <= self.current_minute:
+            return
+        for passed in range(self.current_minute + 1, min(minute, self.current_minute + self.minutes) + 1):
+            i = passed % self.minutes
+            self.total[i] = 0
+            for ring in self.per_code.values():
+                ring[i] = 0
+        self.per_code = {code: ring for code, ring in self.per_code.items() if any(ring)}
+        self.current_minute = minute
+    
+    def snapshot(self, now=None):
+        """(total, {codigo: série}) com as séries do minuto mais antigo ao atual"""
+        minute = int((time.time() if now is None else now) // 60)
+        with self.lock:
+            self._advance(minute)
+            start = (self.current_minute + 1) % self.minutes
+            ordenar = lambda ring: ring[start:].tolist() + ring[:start].tolist()
+            return ordenar(self.total), {code: ordenar(ring) for code, ring in self.per_code.items()}
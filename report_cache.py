@@ -0,0 +1,72 @@
+import hashlib
+import os
+import shutil
+import threading
+
+class ReportCache:
+    """Cache em disco de relatórios gerados, com descarte dos menos usados
+
+    A chave inclui a marca de dados do período (Database.get_watermark), então
+    entradas antigas simplesmente deixam de ser encontradas e saem pelo descarte.
+    """
+
+    def __init__(self, diretorio="relatorios_cache", max_bytes=512 * 1024 * 1024):
+        self.diretorio = diretorio
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        os.makedirs(diretorio, exist_ok=True)
+
+    def _caminho(self, chave, filename):
+        nome = hashlib.sha1(chave.encode("utf-8")).hexdigest()
+        return os.path.join(self.diretorio, nome + os.path.splitext(filename)[1].lower())
+
+    def buscar(self, chave, filename):
+        """Copia o relatório em cache para filename; retorna False se não houver"""
+        caminho = self._caminho(chave, filename)
+        with self.lock:
+            try:
+                shutil.copyfile(caminho, filename)
+            except FileNotFoundError:
+                return False
+            # Último uso fica no mtime, que ordena o descarte
+            os.utime(caminho)
+        return True
+
+    def guardar(self, chave, filename):
+        """Guarda uma cópia do relatório recém-gerado e descarta os mais antigos se passar do limite"""
+        caminho = self._caminho(chave, filename)
+        temporario = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with self.lock:
+            shutil.copyfile(filename, temporario)
+            os.replace(temporario, caminho)
+            self._descartar()
+
+    def limpar(self):
+        with self.lock:
+            for entrada in os.scandir(self.diretorio):
+                if entrada.is_file():
+                    os.remove(entrada.path)
+
+    def tamanho(self):
+        return sum(entrada.stat().st_size for entrada in os.scandir(self.diretorio) if entrada.is_file())
+
+    def _descartar(self):
+        # Outros processos (ex.: gerar_relatorios.py) podem usar o mesmo diretório
+        entradas = []
+        for entrada in os.scandir(self.diretorio):
+            if not entrada.is_file() or entrada.name.endswith(".tmp"):
+                continue
+            try:
+                info = entrada.stat()
+            except FileNotFoundError:
+                continue
+            entradas.append((info.st_mtime, info.st_size, entrada.path))
+        total = sum(tamanho for _, tamanho, _ in entradas)
+        for _, tamanho, caminho in sorted(entradas):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(caminho)
+            except FileNotFoundError:
+                pass
+            total -= tamanho
@@ -1,117 +1,407 @@
-import pandas as pd
-from datetime import datetime
+import os
+from collections import Counter
+from datetime import datetime, timedelta
+from itertools import chain
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
 from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.lib import colors
 from reportlab.lib.units import inch
+from database import TURNOS, intervalo_dia, intervalo_mes
+
+EXCEL_MAX_LINHAS = 1048576  # limite de linhas por aba do Excel, cabeçalho incluído
+EXCEL_FORMATO_DATA = 'DD/MM/YYYY HH:MM:SS'
+
+# Leituras por bloco nas exportações CSV/Parquet (memória limitada ao bloco)
+EXPORTACAO_BLOCO = 100000
+CSV_FORMATO_DATA = '%Y-%m-%d %H:%M:%S.%f'
+
+# Tabelas menores mantêm o custo de diagramação do reportlab linear no número de linhas
+PDF_LINHAS_POR_TABELA = 200
+
+ESTILO_TABELA = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 12),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black)
+])
+
+class RelatorioCancelado(Exception):
+    """Geração interrompida pelo evento de cancelamento"""
+
+class _Acompanhamento:
+    """Repassa o progresso em linhas e interrompe a geração quando cancelada"""
+    
+    def __init__(self, total, progresso=None, cancelado=None):
+        self.total = total
+        self.feitas = 0
+        self.progresso = progresso
+        self.cancelado = cancelado
+    
+    def avancar(self, linhas):
+        if self.cancelado is not None and self.cancelado.is_set():
+            raise RelatorioCancelado()
+        self.feitas += linhas
+        if self.progresso:
+            self.progresso(min(self.feitas, self.total), self.total)
+
+def _remover(filename):
+    """Apaga a exportação interrompida, para não deixar arquivo pela metade"""
+    if os.path.exists(filename):
+        os.remove(filename)
+
+def _deslocamento_ms(segundos):
+    """Diferença entre a hora local e UTC no instante dado, em ms"""
+    local = datetime.fromtimestamp(segundos)
+    return round((local - datetime(1970, 1, 1)).total_seconds()) * 1000 - segundos * 1000
+
+def _ms_para_local(ts, deslocamentos):
+    """Array de epoch-ms -> datetime64[ms] na hora local, sem conversão linha a linha.
+    
+    Fusos mudam de deslocamento só em quartos de hora, então basta calcular um
+    deslocamento por quarto de hora distinto (guardado em deslocamentos entre blocos).
+    """
+    import numpy as np
+    quartos, inverso = np.unique(ts // 900000, return_inverse=True)
+    for quarto in quartos.tolist():
+        if quarto not in deslocamentos:
+            deslocamentos[quarto] = _deslocamento_ms(quarto * 900)
+    ajuste = np.array([deslocamentos[quarto] for quarto in quartos.tolist()], dtype=np.int64)
+    return (ts + ajuste[inverso]).astype('datetime64[ms]')
+
+def _descrever_periodo(inicio, fim):
+    """Texto do período [inicio, fim) para títulos"""
+    if isinstance(inicio, datetime) or isinstance(fim, datetime):
+        return f"{inicio.strftime('%d/%m/%Y %H:%M')} a {fim.strftime('%d/%m/%Y %H:%M')}"
+    ultimo = fim - timedelta(days=1)
+    if ultimo == inicio:
+        return inicio.strftime('%d/%m/%Y')
+    return f"{inicio.strftime('%d/%m/%Y')} a {ultimo.strftime('%d/%m/%Y')}"
 
 class ReportGenerator:
-    def __init__(self, db):
+    def __init__(self, db, cache=None):
         self.db = db
+        # ReportCache opcional: períodos sem dados novos são copiados do cache
+        self.cache = cache
+    
+    # progresso(feitas, total) recebe linhas processadas; cancelado é um
+    # threading.Event que, quando setado, interrompe com RelatorioCancelado
     
-    def gerar_planilha_dia(self, data, filename):
+    def gerar_planilha_dia(self, data, filename, progresso=None, cancelado=None):
         """Gera planilha Excel para um dia específico"""
-        dados = self.db.get_leituras_por_dia(data)
-        
-        if not dados:
-            return False
+        inicio, fim = intervalo_dia(data)
+        return self._com_cache(f'xlsx|dia|{data}', inicio, fim, filename, progresso, lambda: self._gerar_planilha(
+            inicio, fim, f'Leituras_{data}', filename, progresso, cancelado))
+    
+    def gerar_planilha_mes(self, ano, mes, filename, progresso=None, cancelado=None):
+        """Gera planilha Excel para um mês específico"""
+        inicio, fim = intervalo_mes(ano, mes)
+        return self._com_cache(f'xlsx|mes|{ano}-{mes:02d}', inicio, fim, filename, progresso, lambda: self._gerar_planilha(
+            inicio, fim, f'Leituras_{mes:02d}_{ano}', filename, progresso, cancelado))
+    
+    def _com_cache(self, tipo, inicio, fim, filename, progresso, gerar):
+        """Serve o relatório do cache quando período, formato e dados não mudaram"""
+        if self.cache is None:
+            return gerar()
+        # Marca lida antes de gerar: leituras que chegarem durante a geração mudam a chave
+        chave = f"{tipo}|{self.db.get_watermark(inicio, fim)}"
+        if self.cache.buscar(chave, filename):
+            if progresso:
+                progresso(1, 1)
+            return True
+        gerado = gerar()
+        if gerado:
+            self.cache.guardar(chave, filename)
+        return gerado
+    
+    def _gerar_planilha(self, inicio, fim, sheet_name, filename, progresso=None, cancelado=None):
+        """Grava as leituras em modo write-only, linha a linha, conforme saem do banco"""
+        acompanhamento = _Acompanhamento(self.db.contar_leituras(inicio, fim), progresso, cancelado)
+        workbook = Workbook(write_only=True)
+        sheet = None
+        partes = 0
+        linhas = 0
         
-        df = pd.DataFrame(dados, columns=['Código', 'Descrição', 'Data/Hora'])
-        df['Data/Hora'] = pd.to_datetime(df['Data/Hora']).dt.strftime('%d/%m/%Y %H:%M:%S')
+        for bloco in self.db.iter_leituras_periodo(inicio, fim):
+            for codigo, descricao, data_hora in bloco:
+                # Planilha cheia: continua numa nova aba
+                if sheet is None or linhas >= EXCEL_MAX_LINHAS:
+                    partes += 1
+                    sheet = self._nova_aba(workbook, sheet_name if partes == 1 else f'{sheet_name}_{partes}')
+                    linhas = 1
+                
+                cell = WriteOnlyCell(sheet, value=data_hora)
+                cell.number_format = EXCEL_FORMATO_DATA
+                sheet.append([codigo, descricao, cell])
+                linhas += 1
+            acompanhamento.avancar(len(bloco))
         
-        with pd.ExcelWriter(filename, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name=f'Leituras_{data}', index=False)
+        if sheet is None:
+            return False
         
+        workbook.save(filename)
         return True
     
-    def gerar_planilha_mes(self, ano, mes, filename):
-        """Gera planilha Excel para um mês específico"""
-        dados = self.db.get_leituras_por_mes(ano, mes)
-        
-        if not dados:
+    def _nova_aba(self, workbook, titulo):
+        sheet = workbook.create_sheet(titulo[:31])
+        # Larguras precisam ser definidas antes da primeira linha no modo write-only
+        sheet.column_dimensions['A'].width = 18
+        sheet.column_dimensions['B'].width = 40
+        sheet.column_dimensions['C'].width = 20
+        sheet.append(['Código', 'Descrição', 'Data/Hora'])
+        return sheet
+    
+    def exportar_csv(self, inicio, fim, filename, progresso=None, cancelado=None):
+        """Leituras de [inicio, fim) em CSV (codigo_barras, descricao, data_hora)"""
+        return self._com_cache(f'csv|{inicio.isoformat()}|{fim.isoformat()}', inicio, fim, filename, progresso,
+                               lambda: self._exportar_csv(inicio, fim, filename, progresso, cancelado))
+    
+    def exportar_parquet(self, inicio, fim, filename, progresso=None, cancelado=None):
+        """Leituras de [inicio, fim) em Parquet (requer pyarrow)"""
+        return self._com_cache(f'parquet|{inicio.isoformat()}|{fim.isoformat()}', inicio, fim, filename, progresso,
+                               lambda: self._exportar_parquet(inicio, fim, filename, progresso, cancelado))
+    
+    def _exportar_csv(self, inicio, fim, filename, progresso=None, cancelado=None):
+        acompanhamento = _Acompanhamento(self.db.contar_leituras(inicio, fim), progresso, cancelado)
+        if not acompanhamento.total:
             return False
+        try:
+            with open(filename, 'w', newline='', encoding='utf-8') as arquivo:
+                for tabela in self._tabelas_exportacao(inicio, fim, acompanhamento):
+                    tabela.to_csv(arquivo, index=False, header=arquivo.tell() == 0, date_format=CSV_FORMATO_DATA)
+        except Exception:
+            _remover(filename)
+            raise
+        return True
+    
+    def _exportar_parquet(self, inicio, fim, filename, progresso=None, cancelado=None):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        acompanhamento = _Acompanhamento(self.db.contar_leituras(inicio, fim), progresso, cancelado)
+        if not acompanhamento.total:
+            return False
+        # Esquema fixo: inferido do primeiro bloco, descrições todas vazias virariam coluna null
+        esquema = pa.schema([('codigo_barras', pa.string()), ('descricao', pa.string()),
+                             ('data_hora', pa.timestamp('ms'))])
+        writer = None
+        try:
+            writer = pq.ParquetWriter(filename, esquema)
+            for tabela in self._tabelas_exportacao(inicio, fim, acompanhamento):
+                writer.write_table(pa.Table.from_pandas(tabela, schema=esquema, preserve_index=False))
+        except Exception:
+            if writer is not None:
+                writer.close()
+            _remover(filename)
+            raise
+        writer.close()
+        return True
+    
+    def _tabelas_exportacao(self, inicio, fim, acompanhamento):
+        """DataFrames de até EXPORTACAO_BLOCO leituras, montados com operações em array"""
+        import numpy as np
+        import pandas as pd
         
-        df = pd.DataFrame(dados, columns=['Código', 'Descrição', 'Data/Hora'])
-        df['Data/Hora'] = pd.to_datetime(df['Data/Hora']).dt.strftime('%d/%m/%Y %H:%M:%S')
-        
-        with pd.ExcelWriter(filename, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name=f'Leituras_{mes:02d}_{ano}', index=False)
+        # Catálogo carregado uma vez: produto_id -> posição nos arrays de código e descrição
+        catalogo = self.db.get_catalogo_ids()
+        codigos = np.array([codigo for _, codigo, _ in catalogo], dtype=object)
+        descricoes = np.array([descricao for _, _, descricao in catalogo], dtype=object)
+        maior_id = catalogo[-1][0] if catalogo else 0
+        posicao = np.full(maior_id + 1, -1, dtype=np.int64)
+        posicao[[produto_id for produto_id, _, _ in catalogo]] = np.arange(len(catalogo))
+        deslocamentos = {}
         
-        return True
+        for bloco in self.db.iter_leituras_brutas(inicio, fim, chunk_size=EXPORTACAO_BLOCO):
+            # fromiter evita criar um array de tuplas intermediário
+            dados = np.fromiter(chain.from_iterable(bloco), dtype=np.int64, count=2 * len(bloco)).reshape(-1, 2)
+            produto_ids, ts = dados[:, 0], dados[:, 1]
+            # Produtos cadastrados depois da leitura do catálogo ficam de fora, como num JOIN
+            indices = posicao[np.minimum(produto_ids, maior_id)]
+            validos = (produto_ids <= maior_id) & (indices >= 0)
+            yield pd.DataFrame({
+                'codigo_barras': codigos[indices[validos]],
+                'descricao': descricoes[indices[validos]],
+                'data_hora': _ms_para_local(ts[validos], deslocamentos),
+            })
+            acompanhamento.avancar(len(bloco))
     
-    def gerar_pdf_dia(self, data, filename):
+    def gerar_pdf_dia(self, data, filename, progresso=None, cancelado=None):
         """Gera PDF para um dia específico"""
-        dados = self.db.get_leituras_por_dia(data)
-        
-        if not dados:
+        inicio, fim = intervalo_dia(data)
+        return self._com_cache(f'pdf|dia|{data}', inicio, fim, filename, progresso, lambda: self._gerar_pdf(
+            inicio, fim, f"Relatório de Leituras - {data}", filename, progresso, cancelado))
+    
+    def gerar_pdf_mes(self, ano, mes, filename, progresso=None, cancelado=None):
+        """Gera PDF para um mês específico"""
+        inicio, fim = intervalo_mes(ano, mes)
+        return self._com_cache(f'pdf|mes|{ano}-{mes:02d}', inicio, fim, filename, progresso, lambda: self._gerar_pdf(
+            inicio, fim, f"Relatório de Leituras - {mes:02d}/{ano}", filename, progresso, cancelado))
+    
+    def _gerar_pdf(self, inicio, fim, titulo, filename, progresso=None, cancelado=None):
+        """Resumo por produto (calculado no banco) seguido das leituras em tabelas de tamanho fixo"""
+        resumo = self.db.get_totais_periodo(inicio, fim)
+        if not resumo:
             return False
+        acompanhamento = _Acompanhamento(sum(row[2] for row in resumo), progresso, cancelado)
         
         doc = SimpleDocTemplate(filename, pagesize=A4)
         styles = getSampleStyleSheet()
         story = []
         
         # Título
-        title = Paragraph(f"Relatório de Leituras - {data}", styles['Title'])
-        story.append(title)
+        story.append(Paragraph(titulo, styles['Title']))
         story.append(Spacer(1, 0.2*inch))
         
-        # Tabela
-        table_data = [['Código de Barras', 'Descrição', 'Data/Hora']]
-        for row in dados:
-            dt = datetime.strptime(row[2], '%Y-%m-%d %H:%M:%S.%f')
-            table_data.append([row[0], row[1] or 'Sem descrição', dt.strftime('%d/%m/%Y %H:%M:%S')])
-        
-        table = Table(table_data, colWidths=[2*inch, 2.5*inch, 1.5*inch])
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        
-        story.append(table)
+        # Resumo
+        story.append(Paragraph(f"Resumo por produto - {acompanhamento.total} leituras", styles['Heading2']))
+        linhas = [[codigo, descricao or 'Sem descrição', str(quantidade)] for codigo, descricao, quantidade in resumo]
+        story.extend(self._tabelas_pdf(['Código de Barras', 'Descrição', 'Leituras'], linhas))
+        story.append(PageBreak())
+        
+        # Leituras, em blocos que o reportlab diagrama de forma independente
+        story.append(Paragraph("Leituras", styles['Heading2']))
+        for bloco in self.db.iter_leituras_periodo(inicio, fim, chunk_size=PDF_LINHAS_POR_TABELA):
+            linhas = [[codigo, descricao or 'Sem descrição', data_hora.strftime('%d/%m/%Y %H:%M:%S')]
+                      for codigo, descricao, data_hora in bloco]
+            story.extend(self._tabelas_pdf(['Código de Barras', 'Descrição', 'Data/Hora'], linhas))
+            # Montar a lista é rápido; o progresso acompanha a diagramação abaixo
+            acompanhamento.avancar(0)
+        
+        def apos_tabela(flowable):
+            # Conta as linhas de leitura desenhadas (as partes de uma tabela dividida repetem o cabeçalho)
+            celulas = getattr(flowable, '_cellvalues', None)
+            if celulas and celulas[0][2] == 'Data/Hora':
+                acompanhamento.avancar(len(celulas) - 1)
+        
+        doc.afterFlowable = apos_tabela
         doc.build(story)
         return True
     
-    def gerar_pdf_mes(self, ano, mes, filename):
-        """Gera PDF para um mês específico"""
-        dados = self.db.get_leituras_por_mes(ano, mes)
+    def gerar_resumo_planilha(self, inicio, fim, filename, turnos=TURNOS, progresso=None, cancelado=None):
+        """Planilha de totais de [inicio, fim): por produto, por hora e por turno"""
+        return self._com_cache(f'resumo-xlsx|{inicio.isoformat()}|{fim.isoformat()}|{turnos}', inicio, fim, filename,
+                               progresso, lambda: self._gerar_resumo_planilha(inicio, fim, filename, turnos,
+                                                                              progresso, cancelado))
+    
+    def gerar_resumo_pdf(self, inicio, fim, filename, turnos=TURNOS, progresso=None, cancelado=None):
+        """PDF de totais de [inicio, fim): por produto, por hora do dia e por turno"""
+        return self._com_cache(f'resumo-pdf|{inicio.isoformat()}|{fim.isoformat()}|{turnos}', inicio, fim, filename,
+                               progresso, lambda: self._gerar_resumo_pdf(inicio, fim, filename, turnos,
+                                                                         progresso, cancelado))
+    
+    def _dados_resumo(self, inicio, fim, turnos, progresso, cancelado):
+        """Totais agregados no banco; None se o período não tem leituras"""
+        acompanhamento = _Acompanhamento(3, progresso, cancelado)
+        produtos = self.db.get_resumo_produtos(inicio, fim)
+        acompanhamento.avancar(1)
+        if not produtos:
+            return None
+        por_hora = self.db.get_totais_por_hora(inicio, fim)
+        acompanhamento.avancar(1)
+        por_turno = self.db.get_totais_por_turno(inicio, fim, turnos)
+        acompanhamento.avancar(1)
+        return produtos, por_hora, por_turno
+    
+    def _gerar_resumo_planilha(self, inicio, fim, filename, turnos, progresso=None, cancelado=None):
+        dados = self._dados_resumo(inicio, fim, turnos, progresso, cancelado)
+        if dados is None:
+            return False
+        produtos, por_hora, por_turno = dados
         
-        if not dados:
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet('Resumo')
+        sheet.column_dimensions['A'].width = 18
+        sheet.column_dimensions['B'].width = 30
+        sheet.append(['Período', _descrever_periodo(inicio, fim)])
+        sheet.append(['Leituras', sum(linha[2] for linha in produtos)])
+        sheet.append(['Produtos lidos', len(produtos)])
+        sheet.append(['Primeira leitura', self._celula_data(sheet, min(linha[3] for linha in produtos))])
+        sheet.append(['Última leitura', self._celula_data(sheet, max(linha[4] for linha in produtos))])
+        
+        sheet = workbook.create_sheet('Por produto')
+        for coluna, largura in zip('ABCDE', (18, 40, 10, 20, 20)):
+            sheet.column_dimensions[coluna].width = largura
+        sheet.append(['Código', 'Descrição', 'Leituras', 'Primeira leitura', 'Última leitura'])
+        for codigo, descricao, total, primeira, ultima in produtos:
+            sheet.append([codigo, descricao, total, self._celula_data(sheet, primeira), self._celula_data(sheet, ultima)])
+        
+        sheet = workbook.create_sheet('Por hora')
+        sheet.column_dimensions['A'].width = 12
+        sheet.append(['Data', 'Hora', 'Leituras'])
+        for dia, hora, total in por_hora:
+            sheet.append([self._celula_data(sheet, dia, 'DD/MM/YYYY'), f'{hora:02d}:00', total])
+        
+        sheet = workbook.create_sheet('Por turno')
+        sheet.column_dimensions['A'].width = 12
+        sheet.append(['Data', 'Turno', 'Leituras'])
+        for dia, turno, total in por_turno:
+            sheet.append([self._celula_data(sheet, dia, 'DD/MM/YYYY'), turno, total])
+        
+        workbook.save(filename)
+        return True
+    
+    def _celula_data(self, sheet, valor, formato=EXCEL_FORMATO_DATA):
+        cell = WriteOnlyCell(sheet, value=valor)
+        cell.number_format = formato
+        return cell
+    
+    def _gerar_resumo_pdf(self, inicio, fim, filename, turnos, progresso=None, cancelado=None):
+        dados = self._dados_resumo(inicio, fim, turnos, progresso, cancelado)
+        if dados is None:
             return False
+        produtos, por_hora, por_turno = dados
         
         doc = SimpleDocTemplate(filename, pagesize=A4)
         styles = getSampleStyleSheet()
-        story = []
+        story = [Paragraph(f"Resumo de Leituras - {_descrever_periodo(inicio, fim)}", styles['Title']),
+                 Spacer(1, 0.2*inch)]
         
-        # Título
-        title = Paragraph(f"Relatório de Leituras - {mes:02d}/{ano}", styles['Title'])
-        story.append(title)
-        story.append(Spacer(1, 0.2*inch))
+        primeira = min(linha[3] for linha in produtos)
+        ultima = max(linha[4] for linha in produtos)
+        story.append(Paragraph(f"{sum(linha[2] for linha in produtos)} leituras de {len(produtos)} produtos, "
+                               f"de {primeira.strftime('%d/%m/%Y %H:%M:%S')} a {ultima.strftime('%d/%m/%Y %H:%M:%S')}",
+                               styles['Normal']))
+        
+        # Turnos somados no período; o detalhe por dia fica na planilha
+        totais_turno = Counter()
+        for _, turno, total in por_turno:
+            totais_turno[turno] += total
+        story.append(Paragraph("Por turno", styles['Heading2']))
+        story.extend(self._tabelas_pdf(['Turno', 'Horário', 'Leituras'], [
+            [nome, f"{comeco:02d}:00 - {termino:02d}:00", str(totais_turno[nome])]
+            for nome, comeco, termino in turnos
+        ] + ([["Sem turno", "", str(totais_turno["Sem turno"])]] if totais_turno["Sem turno"] else [])))
+        
+        totais_hora = Counter()
+        for _, hora, total in por_hora:
+            totais_hora[hora] += total
+        story.append(Paragraph("Por hora do dia", styles['Heading2']))
+        story.extend(self._tabelas_pdf(['Hora', 'Leituras'],
+                                       [[f"{hora:02d}:00", str(totais_hora[hora])] for hora in sorted(totais_hora)],
+                                       larguras=[2*inch, 2*inch]))
+        
+        story.append(PageBreak())
+        story.append(Paragraph("Por produto", styles['Heading2']))
+        story.extend(self._tabelas_pdf(['Código de Barras', 'Descrição', 'Leituras', 'Primeira', 'Última'], [
+            [codigo, descricao or 'Sem descrição', str(total),
+             primeira.strftime('%d/%m %H:%M'), ultima.strftime('%d/%m %H:%M')]
+            for codigo, descricao, total, primeira, ultima in produtos
+        ], larguras=[1.5*inch, 2.2*inch, 0.8*inch, 1*inch, 1*inch]))
         
-        # Tabela
-        table_data = [['Código de Barras', 'Descrição', 'Data/Hora']]
-        for row in dados:
-            dt = datetime.strptime(row[2], '%Y-%m-%d %H:%M:%S.%f')
-            table_data.append([row[0], row[1] or 'Sem descrição', dt.strftime('%d/%m/%Y %H:%M:%S')])
-        
-        table = Table(table_data, colWidths=[2*inch, 2.5*inch, 1.5*inch])
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        
-        story.append(table)
         doc.build(story)
-        return True
\ No newline at end of file
+        return True
+    
+    def _tabelas_pdf(self, cabecalho, linhas, larguras=None):
+        """Divide as linhas em tabelas de PDF_LINHAS_POR_TABELA com o cabeçalho repetido"""
+        tabelas = []
+        for i in range(0, len(linhas), PDF_LINHAS_POR_TABELA):
+            table = Table([cabecalho] + linhas[i:i + PDF_LINHAS_POR_TABELA],
+                          colWidths=larguras or [2*inch, 2.5*inch, 1.5*inch], repeatRows=1)
+            table.setStyle(ESTILO_TABELA)
+            tabelas.append(table)
+        return tabelas
@@ -0,0 +1,35 @@
+"""Tempos de inicialização do app: etapas e imports pesados, inclusive os feitos sob demanda"""
+
+import time
+from contextlib import contextmanager
+
+INICIO = time.perf_counter()  # importado primeiro pelo main.py
+
+etapas = []       # (etapa, duração em s, instante desde INICIO em s)
+saida = None      # ex.: print; recebe cada etapa assim que é registrada
+_medidas = set()
+
+def marcar(etapa, desde):
+    """Registra uma etapa iniciada em `desde` (valor de time.perf_counter)"""
+    agora = time.perf_counter()
+    etapas.append((etapa, agora - desde, agora - INICIO))
+    if saida:
+        saida(formatar(etapas[-1]))
+
+@contextmanager
+def medir(etapa):
+    """Mede o bloco na primeira execução; as seguintes (imports já em cache) não entram no relatório"""
+    if etapa in _medidas:
+        yield
+        return
+    _medidas.add(etapa)
+    inicio = time.perf_counter()
+    yield
+    marcar(etapa, inicio)
+
+def formatar(registro):
+    etapa, duracao, instante = registro
+    return f"{etapa:<40} {duracao * 1000:8.1f} ms  (t = {instante:.3f} s)"
+
+def relatorio():
+    return "\n".join(["Tempos de inicialização:"] + [formatar(registro) for registro in etapas])
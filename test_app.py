@@ -1,8 +1,30 @@
 #!/usr/bin/env python3
 """Script de teste para verificar funcionamento básico do aplicativo"""
 
-from database import Database
+from database import Database, LeituraWriter
+from datetime import date, datetime
+from decoders import Decoder
 import os
+import time
+
+class DecoderDeTeste(Decoder):
+    """Decodificador falso: acha a região de pixels não nulos e usa o valor do pixel como código"""
+    
+    name = 'teste'
+    
+    def __init__(self, atraso=0.0):
+        self.atraso = atraso  # espera por quadro, multiplicada por (valor % 3)
+        self.formas = []      # formato de cada imagem recebida
+    
+    def decode(self, gray, symbologies=None):
+        import numpy as np
+        self.formas.append(gray.shape)
+        time.sleep(self.atraso * (int(gray.max()) % 3))
+        linhas, colunas = np.nonzero(gray)
+        if not len(linhas):
+            return []
+        top, left = int(linhas.min()), int(colunas.min())
+        return [(str(int(gray[top, left])), (left, top, int(colunas.max()) - left + 1, int(linhas.max()) - top + 1))]
 
 def test_database():
     """Testa funcionalidades básicas do banco de dados"""
@@ -28,9 +50,608 @@ def test_database():
     print(f"Estatísticas: {'OK' if len(stats) > 0 else 'ERRO'}")
     
     # Limpar arquivo de teste
+    db.close()
     os.remove("test.db")
     print("Teste do banco de dados concluído!")
 
+def test_catalogo_cache():
+    """Testa o catálogo em memória, inclusive códigos não cadastrados"""
+    print("Testando catálogo em memória...")
+    
+    db = Database("test_catalogo.db")
+    
+    assert not db.produto_exists("999")
+    db.add_produto("999", "Produto Novo")
+    assert db.produto_exists("999")
+    assert db.get_descricao("999") == "Produto Novo"
+    
+    db.update_produto("999", "888", "Produto Renomeado")
+    assert not db.produto_exists("999")
+    assert db.get_descricao("888") == "Produto Renomeado"
+    
+    db.delete_produto("888")
+    assert not db.produto_exists("888")
+    
+    # Cadastro feito por outra instância (ou processo) aparece após a revalidação
+    import database
+    assert not db.produto_exists("777")
+    outra = Database("test_catalogo.db")
+    outra.add_produto("777", "Produto de Fora")
+    outra.close()
+    revalidar = database.CATALOGO_REVALIDAR_S
+    database.CATALOGO_REVALIDAR_S = 0
+    try:
+        assert db.produto_exists("777")
+        assert db.get_descricao("777") == "Produto de Fora"
+        
+        # Cadastro feito pela própria instância não descarta o catálogo
+        db.add_produto("555", "Produto Local")
+        assert db.produto_exists("555")
+        assert "777" in db._catalogo
+        
+        # ... mas não esconde uma mudança de outro processo feita antes dele
+        assert not db.produto_exists("666")
+        outra = Database("test_catalogo.db")
+        outra.add_produto("666", "Outro de Fora")
+        outra.close()
+        db.add_produto("554", "Outro Local")
+        assert db.produto_exists("666")
+    finally:
+        database.CATALOGO_REVALIDAR_S = revalidar
+    
+    db.close()
+    os.remove("test_catalogo.db")
+    print("Teste do catálogo concluído!")
+
+def test_leitura_writer():
+    """Testa a gravação de leituras em lote em segundo plano"""
+    print("Testando gravação em lote...")
+    
+    db = Database("test_writer.db")
+    db.add_produto("111", "Produto Lote")
+    
+    writer = LeituraWriter(db, flush_interval=0.05)
+    writer.start()
+    for _ in range(100):
+        writer.push("111")
+    writer.push("nao-cadastrado")
+    writer.close()
+    
+    assert db.get_leituras_stats()[0][2] == 100
+    
+    # Cada ciclo start/close fecha a conexão da thread do writer
+    for _ in range(20):
+        writer.start()
+        writer.push("111")
+        writer.close()
+    assert len(db._conexoes) == 1
+    assert db.get_leituras_stats()[0][2] == 120
+    
+    # start() durante um close() de outra thread recomeça o writer depois dele
+    import threading
+    writer.start()
+    for _ in range(1000):
+        writer.push("111")
+    fechando = threading.Thread(target=writer.close)
+    fechando.start()
+    time.sleep(0.01)
+    writer.start()
+    fechando.join()
+    writer.push("111")
+    writer.close()
+    assert db.get_leituras_stats()[0][2] == 1121
+    
+    db.close()
+    os.remove("test_writer.db")
+    print("Teste da gravação em lote concluído!")
+
+def test_leituras_por_periodo():
+    """Testa as consultas por dia e por mês"""
+    print("Testando consultas por período...")
+    
+    db = Database("test_periodo.db")
+    db.add_produto("222", "Produto Período")
+    db.add_leituras([
+        ("222", datetime(2024, 1, 31, 23, 59, 59, 999999)),
+        ("222", datetime(2024, 2, 1, 0, 0, 0, 1)),
+        ("222", datetime(2024, 2, 29, 12, 0, 0, 1)),
+        ("222", datetime(2024, 3, 1, 0, 0, 0, 1)),
+    ])
+    
+    assert len(db.get_leituras_por_dia("2024-02-01")) == 1
+    assert len(db.get_leituras_por_dia("2024-01-31")) == 1
+    assert len(db.get_leituras_por_mes(2024, 2)) == 2
+    assert len(db.get_leituras_por_mes(2024, 12)) == 0
+    
+    blocos = list(db.iter_leituras_por_mes(2024, 2, chunk_size=1))
+    assert [len(bloco) for bloco in blocos] == [1, 1]
+    assert db.contar_leituras(datetime(2024, 2, 1), datetime(2024, 2, 29, 12)) == 1
+    
+    # Totais por período vêm do rollup diário, que precisa bater com a reconstrução
+    assert db.get_total_periodo(date(2024, 2, 1), date(2024, 3, 1)) == 2
+    totais = db.get_totais_periodo(date(2024, 1, 1), date(2025, 1, 1))
+    db.rebuild_rollups()
+    assert db.get_totais_periodo(date(2024, 1, 1), date(2025, 1, 1)) == totais == [("222", "Produto Período", 4)]
+    
+    indices = {row[1] for row in db._get_conn().execute("PRAGMA index_list(leituras)")}
+    assert "idx_leituras_ts" in indices
+    
+    db.close()
+    os.remove("test_periodo.db")
+    print("Teste das consultas por período concluído!")
+
+def test_migracao_chaves_inteiras():
+    """Testa a migração de um banco com leituras em texto para id/epoch-ms"""
+    print("Testando migração do banco antigo...")
+    
+    import sqlite3
+    conn = sqlite3.connect("test_migracao.db")
+    conn.execute("CREATE TABLE produtos (codigo_barras TEXT PRIMARY KEY, descricao TEXT)")
+    conn.execute("CREATE TABLE leituras (id INTEGER PRIMARY KEY AUTOINCREMENT, codigo_barras TEXT, data_hora TIMESTAMP)")
+    conn.execute("INSERT INTO produtos VALUES ('333', 'Produto Antigo')")
+    conn.executemany("INSERT INTO leituras (codigo_barras, data_hora) VALUES (?, ?)", [
+        ("333", "2024-05-01 10:15:30.250000"),
+        ("333", "2024-05-01 11:00:00"),
+        ("removido", "2024-05-01 12:00:00.000000"),
+        ("removido", "2024-05-02 08:00:00"),
+        ("outro", "2024-05-01 13:00:00"),
+    ])
+    conn.commit()
+    conn.close()
+    
+    db = Database("test_migracao.db")
+    leituras = db.get_leituras_por_dia("2024-05-01")
+    assert [row[2] for row in leituras] == [datetime(2024, 5, 1, 10, 15, 30, 250000), datetime(2024, 5, 1, 11, 0)]
+    assert db.get_leituras_stats() == [("333", "Produto Antigo", 2)]
+    # Migrações seguintes (meta, busca) partem do esquema que esta deixou
+    tabelas = {row[0] for row in db._get_conn().execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert "meta" in tabelas
+    assert [codigo for _, codigo, _ in db.get_produtos_pagina(busca="antigo")] == ["333"]
+    
+    # Trocar o código não deixa mais as leituras órfãs
+    db.update_produto("333", "444", "Produto Novo")
+    assert db.get_leituras_stats() == [("444", "Produto Novo", 2)]
+    
+    # Leituras de códigos sem cadastro ficam guardadas e voltam ao recadastrar o código
+    assert db.add_produto("removido", "Produto Removido")
+    db.upsert_produtos([("outro", "Outro Produto")])
+    assert sorted(db.get_leituras_stats()) == [("444", "Produto Novo", 2), ("outro", "Outro Produto", 1),
+                                               ("removido", "Produto Removido", 2)]
+    assert len(db.get_leituras_por_dia("2024-05-02")) == 1
+    totais = db.get_totais_periodo(date(2024, 5, 1), date(2024, 5, 3))
+    db.rebuild_rollups()
+    assert db.get_totais_periodo(date(2024, 5, 1), date(2024, 5, 3)) == totais
+    assert db._get_conn().execute("SELECT COUNT(*) FROM leituras_orfas").fetchone()[0] == 0
+    
+    db.close()
+    os.remove("test_migracao.db")
+    print("Teste da migração concluído!")
+
+def test_importacao_catalogo():
+    """Testa a importação em lote do catálogo a partir de CSV"""
+    print("Testando importação do catálogo...")
+    
+    from catalogo import exportar_catalogo, importar_catalogo
+    
+    db = Database("test_catalogo_lote.db")
+    db.add_produto("001", "Descrição antiga")
+    
+    with open("test_catalogo.csv", "w", encoding="utf-8") as arquivo:
+        arquivo.write("codigo;descricao\n001;Descrição nova\n002;Produto 2\n;Sem código\n003\n002;Produto 2b\n")
+    
+    resultado = importar_catalogo(db, "test_catalogo.csv")
+    assert resultado == {'inseridos': 2, 'atualizados': 1, 'duplicados': 1, 'rejeitados': 1}
+    assert db.get_descricao("001") == "Descrição nova"
+    assert db.get_descricao("002") == "Produto 2b"
+    assert db.get_descricao("003") == ""
+    
+    # Linha só com o código (ou descrição vazia) não apaga a descrição cadastrada
+    assert db.upsert_produtos([("001",), ("002", None), ("003", "  ")])['atualizados'] == 3
+    assert db.get_descricao("001") == "Descrição nova"
+    assert db.get_descricao("002") == "Produto 2b"
+    assert db.produto_exists("003")
+    
+    assert exportar_catalogo(db, "test_catalogo.csv") == 3
+    
+    db.close()
+    os.remove("test_catalogo_lote.db")
+    os.remove("test_catalogo.csv")
+    print("Teste da importação concluído!")
+
+def test_cache_relatorios():
+    """Testa a marca de dados do período e o cache em disco de relatórios"""
+    print("Testando cache de relatórios...")
+    
+    import shutil
+    from report_cache import ReportCache
+    
+    db = Database("test_cache.db")
+    db.add_produto("555", "Produto Cache")
+    db.add_leituras([("555", datetime(2024, 6, 10, 8, 0))])
+    
+    marca = db.get_watermark(datetime(2024, 6, 10), datetime(2024, 6, 11))
+    db.add_leituras([("555", datetime(2024, 6, 11, 8, 0))])
+    assert db.get_watermark(datetime(2024, 6, 10), datetime(2024, 6, 11)) == marca
+    db.update_produto("555", "555", "Produto Renomeado")
+    assert db.get_watermark(datetime(2024, 6, 10), datetime(2024, 6, 11)) != marca
+    
+    cache = ReportCache("test_cache_dir", max_bytes=10)
+    with open("test_cache.csv", "w") as arquivo:
+        arquivo.write("12345")
+    cache.guardar("a", "test_cache.csv")
+    cache.guardar("b", "test_cache.csv")
+    # Só cabem 10 bytes: ao entrar "c" sai o usado há mais tempo ("b")
+    os.utime(cache._caminho("b", "test_cache.csv"), (0, 0))
+    assert cache.buscar("a", "test_cache.csv")
+    cache.guardar("c", "test_cache.csv")
+    assert cache.buscar("a", "test_cache.csv") and not cache.buscar("b", "test_cache.csv")
+    
+    db.close()
+    shutil.rmtree("test_cache_dir")
+    os.remove("test_cache.db")
+    os.remove("test_cache.csv")
+    print("Teste do cache de relatórios concluído!")
+
+def test_planilha_abas():
+    """Testa a divisão da planilha em abas ao atingir o limite de linhas"""
+    print("Testando planilha com várias abas...")
+    
+    from openpyxl import load_workbook
+    import report_generator
+    from report_generator import ReportGenerator
+    
+    db = Database("test_planilha.db")
+    db.add_produto("123", "Produto Planilha")
+    db.add_leituras([("123", datetime(2024, 9, 1, 8, minuto, 30)) for minuto in range(5)])
+    
+    # Cabeçalho + 2 leituras por aba
+    report_generator.EXCEL_MAX_LINHAS = 3
+    try:
+        assert ReportGenerator(db).gerar_planilha_dia("2024-09-01", "test_planilha.xlsx")
+    finally:
+        report_generator.EXCEL_MAX_LINHAS = 1048576
+    
+    workbook = load_workbook("test_planilha.xlsx")
+    assert workbook.sheetnames == ["Leituras_2024-09-01", "Leituras_2024-09-01_2", "Leituras_2024-09-01_3"]
+    assert [sheet.max_row for sheet in workbook.worksheets] == [3, 3, 2]
+    assert [cell.value for cell in workbook.worksheets[0][1]] == ["Código", "Descrição", "Data/Hora"]
+    cell = workbook.worksheets[2]["C2"]
+    assert cell.value == datetime(2024, 9, 1, 8, 4, 30)
+    assert cell.number_format == report_generator.EXCEL_FORMATO_DATA == "DD/MM/YYYY HH:MM:SS"
+    workbook.close()
+    
+    db.close()
+    os.remove("test_planilha.db")
+    os.remove("test_planilha.xlsx")
+    print("Teste da planilha com várias abas concluído!")
+
+def test_ritmo_leituras():
+    """Testa o anel de leituras por minuto: avanço, expiração, ordem e leituras atrasadas"""
+    print("Testando ritmo de leituras...")
+    
+    from read_rate import ReadRateRing
+    
+    ritmo = ReadRateRing(minutes=3)
+    t0 = 1000 * 60  # início do minuto 1000
+    ritmo.add("A", t0)
+    ritmo.add("A", t0 + 10)
+    ritmo.add("B", t0 + 30)
+    assert ritmo.snapshot(now=t0 + 59) == ([0, 0, 3], {"A": [0, 0, 2], "B": [0, 0, 1]})
+    
+    # Virada de minuto: séries do mais antigo ao atual
+    ritmo.add("A", t0 + 60)
+    assert ritmo.snapshot(now=t0 + 60) == ([0, 3, 1], {"A": [0, 2, 1], "B": [0, 1, 0]})
+    
+    # Atrasada dentro da janela entra no minuto dela; fora da janela é descartada
+    ritmo.add("B", t0 - 60)
+    ritmo.add("A", t0 - 3 * 60)
+    assert ritmo.snapshot(now=t0 + 60) == ([1, 3, 1], {"A": [0, 2, 1], "B": [1, 1, 0]})
+    
+    # Minutos que saem da janela expiram; produto sem leituras na janela some
+    assert ritmo.snapshot(now=t0 + 3 * 60) == ([1, 0, 0], {"A": [1, 0, 0]})
+    assert ritmo.snapshot(now=t0 + 10 * 60) == ([0, 0, 0], {})
+    ritmo.add("C", t0 + 10 * 60 + 5)
+    assert ritmo.snapshot(now=t0 + 10 * 60 + 5) == ([0, 0, 1], {"C": [0, 0, 1]})
+    print("Teste do ritmo de leituras concluído!")
+
+def test_escolha_decodificador():
+    """Testa a escolha do decodificador com decodificadores falsos (sem OpenCV e pyzbar)"""
+    print("Testando escolha do decodificador...")
+    
+    import decoders
+    
+    class Completo(decoders.Decoder):
+        name = 'teste-completo'
+        
+        def decode(self, gray, symbologies=None):
+            time.sleep(0.002)
+            return [("123", (0, 0, 1, 1))] if gray else []
+    
+    class Rapido(decoders.Decoder):
+        name = 'teste-rapido'
+        
+        def decode(self, gray, symbologies=None):
+            return [("123", (0, 0, 1, 1))] if gray == 1 else []
+    
+    try:
+        decoders.Decoder()
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("Decoder deveria ser abstrata")
+    
+    for classe in (Completo, Rapido):
+        decoders.DECODERS[classe.name] = classe
+    try:
+        # Quadros "com código": 1 e 2; o rápido só acha o 1
+        quadros = [0, 1, 2, 1, 2]
+        nomes = [Completo.name, Rapido.name]
+        melhor, resultados = decoders.benchmark_decoders(quadros, 0.9, names=nomes)
+        assert melhor == Completo.name
+        assert resultados[Completo.name]['detection_rate'] == 1.0
+        assert resultados[Rapido.name]['detection_rate'] == 0.5
+        assert resultados[Rapido.name]['fps'] > resultados[Completo.name]['fps']
+        
+        # Com a exigência baixa vence o mais rápido
+        assert decoders.benchmark_decoders(quadros, 0.5, names=nomes)[0] == Rapido.name
+        # Nenhum atinge o limite: fica o que mais detecta
+        assert decoders.benchmark_decoders(quadros, 1.01, names=nomes)[0] == Completo.name
+        assert Completo.name in decoders.available_decoders()
+        
+        # Nomes de simbologia valem nas duas grafias; desconhecidos são recusados
+        assert decoders.normalize_symbologies(['EAN_13', 'code128']) == ('EAN13', 'CODE128')
+        assert decoders.normalize_symbologies([]) is None
+        try:
+            decoders.normalize_symbologies(['EAN13', 'XYZ'])
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("simbologia desconhecida deveria ser recusada")
+    finally:
+        for classe in (Completo, Rapido):
+            decoders.DECODERS.pop(classe.name, None)
+            decoders._instances.pop(classe.name, None)
+    print("Teste da escolha do decodificador concluído!")
+
+def test_movimento_e_roi():
+    """Testa o gate de movimento e a decodificação por regiões com recuo para o quadro inteiro"""
+    print("Testando gate de movimento e ROI...")
+    
+    try:
+        from barcode_reader import BarcodeReader, decode_frame
+    except ImportError:
+        print("Gate de movimento e ROI não testados (OpenCV/pyzbar não instalados)")
+        return
+    import numpy as np
+    
+    db = Database("test_leitor.db")
+    leitor = BarcodeReader(db=db)
+    
+    # Imagem parada é pulada, mas decodificada de novo após motion_max_interval
+    parado = np.zeros((90, 160), np.uint8)
+    assert leitor._has_motion(parado, 0.0)
+    assert not leitor._has_motion(parado, 0.5)
+    assert leitor._has_motion(parado, 1.0)
+    # Mudança lenta acumula contra o último quadro decodificado
+    assert not leitor._has_motion(parado + 1, 1.1)
+    assert leitor._has_motion(parado + 2, 1.2)
+    assert leitor._has_motion(np.full((90, 160), 255, np.uint8), 1.3)
+    leitor.motion_gate = False
+    assert leitor._has_motion(np.full((90, 160), 255, np.uint8), 1.4)
+    
+    # Regiões da última leitura, com o quadro inteiro a cada roi_full_every
+    leitor.roi_full_every = 2
+    leitor._last_rects = [(120, 40, 30, 10)]
+    assert [leitor._next_rois() for _ in range(4)] == [[(120, 40, 30, 10)], [(120, 40, 30, 10)], None,
+                                                       [(120, 40, 30, 10)]]
+    
+    decoder = DecoderDeTeste()
+    quadro = np.zeros((100, 200), np.uint8)
+    quadro[40:50, 120:150] = 9
+    esperado = [("9", (120, 40, 30, 10))]
+    assert decode_frame(quadro, None, 0.5, None, None, decoder) == (esperado, None)
+    # Região certa: só o recorte (com margem) é decodificado e o retângulo volta ao quadro
+    decoder.formas.clear()
+    assert decode_frame(quadro, [(120, 40, 30, 10)], 0.5, None, None, decoder) == (esperado, True)
+    assert decoder.formas == [(36, 76)]
+    # Região errada: recorte sem código, recua para o quadro inteiro
+    decoder.formas.clear()
+    assert decode_frame(quadro, [(0, 0, 10, 10)], 0.5, None, None, decoder) == (esperado, False)
+    assert decoder.formas == [(23, 23), (100, 200)]
+    
+    db.close()
+    os.remove("test_leitor.db")
+    print("Teste do gate de movimento e ROI concluído!")
+
+def test_piramide_decodificacao():
+    """Testa a tentativa reduzida da pirâmide e a escala dos retângulos de volta ao quadro"""
+    print("Testando pirâmide de decodificação...")
+    
+    try:
+        from barcode_reader import decode_frame
+    except ImportError:
+        print("Pirâmide de decodificação não testada (OpenCV/pyzbar não instalados)")
+        return
+    import numpy as np
+    
+    decoder = DecoderDeTeste()
+    quadro = np.zeros((100, 2000), np.uint8)
+    quadro[20:60, 400:800] = 5
+    
+    # Achado na versão reduzida (metade): nem chega à resolução cheia
+    assert decode_frame(quadro, downscale_width=1000, decoder=decoder) == ([("5", (400, 20, 400, 40))], None)
+    assert decoder.formas == [(50, 1000)]
+    
+    # downscale_width=None, ou quadro já estreito: só a resolução cheia
+    decoder.formas.clear()
+    assert decode_frame(quadro, downscale_width=None, decoder=decoder) == ([("5", (400, 20, 400, 40))], None)
+    assert decode_frame(quadro, downscale_width=2000, decoder=decoder)[0] == [("5", (400, 20, 400, 40))]
+    assert decoder.formas == [(100, 2000), (100, 2000)]
+    
+    # Código que some na redução: recua para a resolução cheia
+    decoder.formas.clear()
+    pequeno = np.zeros((100, 2000), np.uint8)
+    pequeno[31, 901] = 1
+    assert decode_frame(pequeno, downscale_width=1000, decoder=decoder) == ([("1", (901, 31, 1, 1))], None)
+    assert decoder.formas == [(50, 1000), (100, 2000)]
+    print("Teste da pirâmide de decodificação concluído!")
+
+def test_pool_decodificacao():
+    """Testa o pool de decodificação: ordem dos resultados, reuso do anel e encerramento"""
+    print("Testando pool de decodificação...")
+    
+    try:
+        from decode_pool import DecodePool
+    except ImportError:
+        print("Pool de decodificação não testado (OpenCV/pyzbar não instalados)")
+        return
+    import numpy as np
+    from multiprocessing import shared_memory
+    
+    decoder = DecoderDeTeste(atraso=0.02)
+    pool = DecodePool((4, 6), np.uint8, workers=2, slots=3)
+    nomes = [shm.name for shm in pool._buffers]
+    try:
+        resultados = []
+        for valor in range(1, 11):
+            if pool.full():
+                try:
+                    pool.submit(np.zeros((4, 6), np.uint8), 0.0, decoder=decoder)
+                except RuntimeError:
+                    pass
+                else:
+                    raise AssertionError("anel cheio deveria recusar o quadro")
+                # Libera o slot mais antigo antes de sobrescrevê-lo
+                resultados.extend(pool.collect(wait=True))
+            quadro = np.full((4, 6), valor, np.uint8)
+            pool.submit(quadro, float(valor), downscale_width=None, decoder=decoder)
+        resultados.extend(pool.drain())
+        
+        # Na ordem dos quadros, mesmo com trabalhadores terminando fora de ordem
+        assert [(decoded, roi_hit, instante) for (decoded, roi_hit), instante in resultados] == [
+            ([(str(valor), (0, 0, 6, 4))], None, float(valor)) for valor in range(1, 11)]
+        
+        # Com regiões da última leitura, o retângulo volta nas coordenadas do quadro
+        quadro = np.zeros((4, 6), np.uint8)
+        quadro[1:3, 3:5] = 7
+        pool.submit(quadro, 11.0, rois=[(3, 1, 2, 2)], roi_margin=0, downscale_width=None, decoder=decoder)
+        assert pool.drain() == [(([("7", (3, 1, 2, 2))], True), 11.0)]
+        assert not pool.full() and pool.collect() == []
+    finally:
+        pool.close()
+    
+    # close() remove a memória compartilhada do anel
+    for nome in nomes:
+        try:
+            shared_memory.SharedMemory(name=nome).close()
+        except FileNotFoundError:
+            pass
+        else:
+            raise AssertionError(f"memória compartilhada {nome} não foi removida")
+    print("Teste do pool de decodificação concluído!")
+
+def test_exportacao_csv():
+    """Testa a exportação CSV em blocos contra a consulta linha a linha"""
+    print("Testando exportação CSV...")
+    
+    import csv
+    import report_generator
+    from report_generator import ReportGenerator
+    
+    db = Database("test_exportacao.db")
+    db.add_produto("666", "Produto Exportado")
+    db.add_produto("777", None)
+    db.add_leituras([("666", datetime(2024, 7, 1, 10, 0, 0, 123000)), ("777", datetime(2024, 7, 1, 23, 59, 59)),
+                     ("666", datetime(2024, 7, 2, 0, 0))])
+    
+    report_generator.EXPORTACAO_BLOCO = 1
+    try:
+        assert ReportGenerator(db).exportar_csv(date(2024, 7, 1), date(2024, 7, 2), "test_exportacao.csv")
+    finally:
+        report_generator.EXPORTACAO_BLOCO = 100000
+    with open("test_exportacao.csv", newline="", encoding="utf-8") as arquivo:
+        linhas = list(csv.reader(arquivo))
+    assert linhas == [["codigo_barras", "descricao", "data_hora"],
+                      ["666", "Produto Exportado", "2024-07-01 10:00:00.123000"],
+                      ["777", "", "2024-07-01 23:59:59.000000"]]
+    
+    db.close()
+    os.remove("test_exportacao.db")
+    os.remove("test_exportacao.csv")
+    print("Teste da exportação CSV concluído!")
+
+def test_exportacao_parquet():
+    """Testa a exportação Parquet em blocos com descrições vazias no primeiro bloco"""
+    print("Testando exportação Parquet...")
+    
+    import pyarrow.parquet as pq
+    import report_generator
+    from report_generator import ReportGenerator
+    
+    db = Database("test_parquet.db")
+    db.add_produto("1", None)
+    db.add_produto("2", "X")
+    db.add_leituras([("1", datetime(2024, 7, 1, 10, 0, 0, 123000)), ("2", datetime(2024, 7, 1, 11, 0))])
+    
+    report_generator.EXPORTACAO_BLOCO = 1
+    try:
+        assert ReportGenerator(db).exportar_parquet(date(2024, 7, 1), date(2024, 7, 2), "test_exportacao.parquet")
+    finally:
+        report_generator.EXPORTACAO_BLOCO = 100000
+    tabela = pq.read_table("test_exportacao.parquet")
+    assert str(tabela.schema.field("descricao").type) == "string"
+    assert tabela.to_pydict() == {"codigo_barras": ["1", "2"], "descricao": [None, "X"],
+                                  "data_hora": [datetime(2024, 7, 1, 10, 0, 0, 123000), datetime(2024, 7, 1, 11, 0)]}
+    
+    db.close()
+    os.remove("test_parquet.db")
+    os.remove("test_exportacao.parquet")
+    print("Teste da exportação Parquet concluído!")
+
+def test_totais_agregados():
+    """Testa os totais por hora, turno e produto calculados no banco"""
+    print("Testando totais agregados...")
+    
+    db = Database("test_totais.db")
+    db.add_produto("888", "Produto Turno")
+    db.add_leituras([("888", datetime(2024, 8, 1, 6, 30)), ("888", datetime(2024, 8, 1, 6, 45)),
+                     ("888", datetime(2024, 8, 1, 23, 0)), ("888", datetime(2024, 8, 2, 1, 15))])
+    
+    assert db.get_totais_por_hora(date(2024, 8, 1), date(2024, 8, 2)) == [(date(2024, 8, 1), 6, 2),
+                                                                           (date(2024, 8, 1), 23, 1)]
+    # A 01:15 do dia 2 pertence ao turno da noite que começou no dia 1
+    assert db.get_totais_por_turno(date(2024, 8, 1), date(2024, 8, 3)) == [(date(2024, 8, 1), "Manhã", 2),
+                                                                            (date(2024, 8, 1), "Noite", 2)]
+    assert db.get_resumo_produtos(date(2024, 8, 1), date(2024, 8, 3)) == [
+        ("888", "Produto Turno", 4, datetime(2024, 8, 1, 6, 30), datetime(2024, 8, 2, 1, 15))]
+    assert db.get_resumo_produtos(datetime(2024, 8, 1, 7), datetime(2024, 8, 3)) == [
+        ("888", "Produto Turno", 2, datetime(2024, 8, 1, 23, 0), datetime(2024, 8, 2, 1, 15))]
+    
+    db.close()
+    os.remove("test_totais.db")
+    print("Teste dos totais agregados concluído!")
+
+def test_busca_produtos():
+    """Testa a paginação e a busca por código e por descrição"""
+    print("Testando busca de produtos...")
+    
+    db = Database("test_busca.db")
+    db.upsert_produtos([("003", "Açúcar Cristal"), ("001", "Arroz Integral"), ("002", "Feijão Preto"), ("100", None)])
+    
+    pagina = db.get_produtos_pagina(limite=2)
+    assert [codigo for _, codigo, _ in pagina] == ["001", "002"]
+    assert [codigo for _, codigo, _ in db.get_produtos_pagina(apos="002", limite=2)] == ["003", "100"]
+    
+    assert [codigo for _, codigo, _ in db.get_produtos_pagina(busca="00")] == ["001", "002", "003"]
+    assert [codigo for _, codigo, _ in db.get_produtos_pagina(busca="acucar cri")] == ["003"]
+    db.update_produto("002", "002", "Feijão Carioca")
+    assert [codigo for _, codigo, _ in db.get_produtos_pagina(busca="cario")] == ["002"]
+    assert db.get_produtos_pagina(busca="preto") == []
+    
+    db.close()
+    os.remove("test_busca.db")
+    print("Teste da busca de produtos concluído!")
+
 def check_dependencies():
     """Verifica se todas as dependências estão instaladas"""
     print("Verificando dependências...")
@@ -65,6 +686,22 @@ if __name__ == "__main__":
     check_dependencies()
     print()
     test_database()
+    test_catalogo_cache()
+    test_leitura_writer()
+    test_leituras_por_periodo()
+    test_migracao_chaves_inteiras()
+    test_importacao_catalogo()
+    test_cache_relatorios()
+    test_planilha_abas()
+    test_ritmo_leituras()
+    test_escolha_decodificador()
+    test_movimento_e_roi()
+    test_piramide_decodificacao()
+    test_pool_decodificacao()
+    test_exportacao_csv()
+    test_exportacao_parquet()
+    test_totais_agregados()
+    test_busca_produtos()
     
     print("\n=== TESTE CONCLUÍDO ===")
     print("Para executar o aplicativo: python main.py")
\ No newline at end of file